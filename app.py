@@ -1,17 +1,35 @@
+import hmac
 import os
-from flask import Flask
+from flask import Flask, Response, jsonify, request
 from flask_mail import Mail
-from pymongo import MongoClient
+from pymongo.errors import PyMongoError
 from flask_cors import CORS
 from routes.tasks import tasks_bp
 from routes.users import users_bp
 from routes.auth import auth_bp
 from routes.mail import mail_bp
 from dotenv import load_dotenv
+from utils.indexes import ensure_indexes
+from utils.migrations import run_migrations
+from utils.user_loader import init_user_cache
+from utils.mail_outbox import OutboxWorker
+from utils.token_store import init_token_store
+from utils.hashing import HashingBusy
+from utils.json_provider import MongoJSONProvider
+from utils.events import init_event_bus
+from utils.rate_limit import init_rate_limiter, rate_limit_config_from_env
+from werkzeug.middleware.proxy_fix import ProxyFix
+from utils.mongo import MongoConnection, mongo_config_from_env
+from utils.metrics import CommandMetrics, init_metrics, render_metrics
+from utils.profiler import SlowQueryProfiler
+from utils.jwt_manager import token_required
+from utils.role_decorator import role_required
 
 def create_app():
     load_dotenv()
     app = Flask(__name__)
+    # Serializes ObjectId, datetime and other BSON types directly (orjson when installed)
+    app.json = MongoJSONProvider(app)
 
     
     # Register blueprints
@@ -23,25 +41,120 @@ def create_app():
     # Set the secret key for JWT
     app.config['SECRET_KEY'] = os.getenv('SECRET_KEY')  # Replace with your actual secret key
 
-    # Initialize MongoDB client
-    client = MongoClient('localhost', 27017)
-    app.config['MONGO_CLIENT'] = client
-    app.config['MONGO_DB'] = client.flask_db
+    # 'dev' (Flask development server) or 'production' (pre-forked workers, see run.py)
+    app.config['SERVER_MODE'] = os.getenv('SERVER_MODE', 'dev')
+
+    # MongoDB: configured from MONGO_* env vars, connected lazily in each process
+    mongo_config_from_env(app)
+    # Slow query profiler, enabled by SLOW_QUERY_MS (see utils/profiler.py)
+    profiler = SlowQueryProfiler.from_env(app)
+    app.extensions['slow_query_profiler'] = profiler
+    listeners = [CommandMetrics()] + ([profiler] if profiler else [])
+    app.config['MONGO_DB'] = MongoConnection.from_config(app.config, event_listeners=listeners)
+
+    # Request latency, Mongo command and pool metrics served at /metrics
+    app.config['METRICS_TOKEN'] = os.getenv('METRICS_TOKEN')
+    init_metrics(app)
+
+    # Apply pending data migrations and make sure the query indexes exist
+    try:
+        run_migrations(app.config['MONGO_DB'])
+        for collection, keys, error in ensure_indexes(app.config['MONGO_DB']):
+            app.logger.warning(f"Index {keys} on {collection} could not be built: {error}")
+    except PyMongoError as e:
+        app.logger.warning(f"Database bootstrap failed: {e}")
+
+    # Cache of authenticated users shared by token_required/role_required and the routes
+    app.config['USER_CACHE_TTL'] = float(os.getenv('USER_CACHE_TTL', 30))
+    app.config['USER_CACHE_SIZE'] = int(os.getenv('USER_CACHE_SIZE', 1024))
+    app.config['TOKEN_VERSION_CACHE_TTL'] = float(os.getenv('TOKEN_VERSION_CACHE_TTL', 5))
+    init_user_cache(app)
+
+    # Store for OTPs and password reset tokens: 'mongo' (shared by all workers) or 'memory'
+    app.config['TOKEN_STORE'] = os.getenv('TOKEN_STORE', 'mongo')
+    init_token_store(app)
+
+    # Rate limits for login, OTP and email check endpoints: 'memory' (per process),
+    # 'mongo' (shared by all workers) or 'off'
+    rate_limit_config_from_env(app)
+    init_rate_limiter(app)
+
+    # Behind PROXY_COUNT reverse proxies, take the client IP from X-Forwarded-For
+    proxy_count = int(os.getenv('PROXY_COUNT', 0))
+    if proxy_count:
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=proxy_count, x_proto=proxy_count)
+
+    # Task change events for /tasks/stream: published by the routes ('local') or
+    # read from a Mongo change stream ('changestream', needs a replica set)
+    app.config['EVENT_SOURCE'] = os.getenv('EVENT_SOURCE', 'local')
+    app.config['EVENT_QUEUE_SIZE'] = int(os.getenv('EVENT_QUEUE_SIZE', 100))
+    app.config['EVENT_HEARTBEAT'] = float(os.getenv('EVENT_HEARTBEAT', 15))
+    # Open streams per process; each holds a request thread or greenlet (see utils/server.py)
+    app.config['EVENT_MAX_STREAMS'] = int(os.getenv('EVENT_MAX_STREAMS', 1000))
+    init_event_bus(app)
 
     # Flask-Mail configuration
-    app.config['MAIL_SERVER'] = 'smtp.gmail.com'
-    app.config['MAIL_PORT'] = 587
+    app.config['MAIL_SERVER'] = os.getenv('MAIL_SERVER', 'smtp.gmail.com')
+    app.config['MAIL_PORT'] = int(os.getenv('MAIL_PORT', 587))
     app.config['MAIL_USERNAME'] = os.getenv('MAIL_USERNAME')  
     app.config['MAIL_PASSWORD'] = os.getenv('MAIL_PASSWORD') 
-    app.config['MAIL_USE_TLS'] = True
+    app.config['MAIL_USE_TLS'] = os.getenv('MAIL_USE_TLS', 'true').lower() == 'true'
     app.config['MAIL_USE_SSL'] = False
 
+    # Mail outbox: emails are queued in Mongo and delivered by a background worker.
+    # Set MAIL_OUTBOX_WORKER=false to only enqueue and run `flask mail-worker` separately.
+    app.config['MAIL_OUTBOX_WORKER'] = os.getenv('MAIL_OUTBOX_WORKER', 'true').lower() == 'true'
+    app.config['MAIL_OUTBOX_BATCH_SIZE'] = int(os.getenv('MAIL_OUTBOX_BATCH_SIZE', 50))
+    app.config['MAIL_OUTBOX_MAX_ATTEMPTS'] = int(os.getenv('MAIL_OUTBOX_MAX_ATTEMPTS', 5))
+    app.config['MAIL_OUTBOX_LEASE'] = float(os.getenv('MAIL_OUTBOX_LEASE', 60))
+
     # Initialize CORS
     CORS(app)
 
     # Initialize Flask-Mail
     mail = Mail(app)
 
+    # Password hashing pool saturated: fail fast instead of queueing the request
+    @app.errorhandler(HashingBusy)
+    def hashing_busy(e):
+        resp = jsonify({'msg': 'Server is busy, please try again shortly'})
+        resp.headers['Retry-After'] = '1'
+        return resp, 503
+
+    @app.cli.command('mail-worker')
+    def mail_worker():
+        """Deliver queued emails in the foreground."""
+        OutboxWorker(app).run()
+
+    # Connection pool counters of this process, per server
+    @app.route('/mongo/pool')
+    @token_required
+    @role_required(['admin'])
+    def mongo_pool(user_id):
+        return jsonify(app.config['MONGO_DB'].pool_stats.snapshot()), 200
+
+    # Slow query shapes seen by this process, worst first; DELETE clears them
+    @app.route('/profiler/slow_queries', methods=['GET', 'DELETE'])
+    @token_required
+    @role_required(['admin'])
+    def slow_queries(user_id):
+        profiler = app.extensions.get('slow_query_profiler')
+        if profiler is None:
+            return jsonify({'msg': 'Slow query profiler is disabled. Set SLOW_QUERY_MS to enable it'}), 404
+        if request.method == 'DELETE':
+            profiler.reset()
+            return jsonify({'msg': 'Slow query profile cleared'}), 200
+        limit = request.args.get('limit', 50, type=int)
+        return jsonify({'threshold_ms': profiler.threshold_ms, 'queries': profiler.report(limit)}), 200
+
+    # Prometheus metrics of this process; needs `Authorization: Bearer <METRICS_TOKEN>` when set
+    @app.route('/metrics')
+    def metrics():
+        token = app.config.get('METRICS_TOKEN')
+        if token and not hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}'):
+            return jsonify({'msg': 'Unauthorized'}), 401
+        return Response(render_metrics(app), mimetype='text/plain; version=0.0.4')
+
     @app.route('/')
     def home():
         return 'Welcome to the Flask application!'
@@ -0,0 +1,83 @@
+"""Password hashing micro-benchmark.
+
+Reports hash throughput inline vs. through the hashing pool, and verify_password
+latency (the cost of a login) with many concurrent request threads.
+
+    python -m benchmarks.bench_hashing --threads 32 --requests 200
+"""
+import argparse
+import json
+import os
+import threading
+import time
+
+from werkzeug.security import generate_password_hash
+
+from benchmarks.stats import percentile
+
+def bench_inline(count):
+    start = time.perf_counter()
+    for _ in range(count):
+        generate_password_hash('Passw0rd!')
+    return count / (time.perf_counter() - start)
+
+def bench_concurrent_logins(hashing, stored_hash, threads, requests):
+    latencies = []
+    rejected = 0
+    lock = threading.Lock()
+
+    def worker():
+        nonlocal rejected
+        for _ in range(requests // threads):
+            start = time.perf_counter()
+            try:
+                hashing.verify_password('Passw0rd!', stored_hash)
+            except hashing.HashingBusy:
+                with lock:
+                    rejected += 1
+                continue
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies.append(elapsed)
+
+    pool = [threading.Thread(target=worker) for _ in range(threads)]
+    start = time.perf_counter()
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    duration = time.perf_counter() - start
+
+    return {
+        'completed': len(latencies),
+        'rejected_503': rejected,
+        'hashes_per_sec': len(latencies) / duration,
+        'p50_ms': percentile(latencies, 50) * 1000 if latencies else None,
+        'p99_ms': percentile(latencies, 99) * 1000 if latencies else None
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--threads', type=int, default=32, help='concurrent request threads')
+    parser.add_argument('--requests', type=int, default=200, help='total logins to simulate')
+    parser.add_argument('--inline-count', type=int, default=20, help='hashes for the inline baseline')
+    args = parser.parse_args()
+
+    stored_hash = generate_password_hash('Passw0rd!')
+    results = {'cpu_count': os.cpu_count(), 'threads': args.threads}
+    results['inline_hashes_per_sec'] = bench_inline(args.inline_count)
+
+    from utils import hashing
+    for workers in ('0', str(os.cpu_count() or 1)):
+        os.environ['HASH_WORKERS'] = workers
+        hashing.shutdown_hashing_pool()
+        if workers != '0':
+            hashing.verify_password('warm-up', stored_hash)  # start the pool processes
+        label = 'inline' if workers == '0' else f'pool_{workers}_workers'
+        results[label] = bench_concurrent_logins(hashing, stored_hash, args.threads, args.requests)
+    hashing.shutdown_hashing_pool()
+
+    print(json.dumps(results, indent=2))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+"""JSON serialization benchmark for large task lists.
+
+Compares the old handler path (copy every task into a new dict, stringify ids
+and dates by hand, encode with Flask's default provider) with returning the
+documents through MongoJSONProvider, with and without orjson.
+
+    python -m benchmarks.bench_json --tasks 20000
+"""
+import argparse
+import json
+import time
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+from utils import json_provider
+from utils.json_provider import MongoJSONProvider
+
+def make_tasks(count, comments_per_task):
+    now = datetime.utcnow()
+    tasks = []
+    for i in range(count):
+        tasks.append({
+            "_id": ObjectId(),
+            "title": f"Task {i}",
+            "description": "Lorem ipsum dolor sit amet " * 4,
+            "status": "pending",
+            "assigned_to": f"user{i % 100}",
+            "due_date": "2025-01-01",
+            "priority_label": "High",
+            "comments": [{
+                "text": "Looks good to me",
+                "user": ObjectId(),
+                "author": "reviewer",
+                "createdAt": now - timedelta(minutes=j)
+            } for j in range(comments_per_task)]
+        })
+    return tasks
+
+def legacy_convert(obj):
+    if isinstance(obj, ObjectId):
+        return str(obj)
+    if isinstance(obj, datetime):
+        return obj.isoformat()
+    if isinstance(obj, dict):
+        return {k: legacy_convert(v) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [legacy_convert(item) for item in obj]
+    return obj
+
+def legacy_path(app, tasks):
+    payload = [{
+        "_id": str(task["_id"]),
+        "title": task.get("title"),
+        "description": task.get("description"),
+        "status": task.get("status"),
+        "assigned_to": task.get("assigned_to"),
+        "due_date": task.get("due_date"),
+        "priority": task.get("priority_label"),
+        "comments": legacy_convert(task.get("comments", []))
+    } for task in tasks]
+    return app.json.dumps(payload)
+
+def provider_path(app, tasks):
+    return app.json.dumps(tasks)
+
+def timed(fn, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--tasks', type=int, default=20000)
+    parser.add_argument('--comments', type=int, default=5, help='comments per task')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    tasks = make_tasks(args.tasks, args.comments)
+    results = {'tasks': args.tasks, 'comments_per_task': args.comments}
+
+    app = Flask(__name__)
+    app.json = DefaultJSONProvider(app)
+    results['legacy_convert_default_provider_ms'] = timed(lambda: legacy_path(app, tasks), args.repeat)
+
+    orjson = json_provider.orjson
+    app.json = MongoJSONProvider(app)
+    json_provider.orjson = None
+    results['mongo_provider_stdlib_ms'] = timed(lambda: provider_path(app, tasks), args.repeat)
+    json_provider.orjson = orjson
+    if orjson is not None:
+        results['mongo_provider_orjson_ms'] = timed(lambda: provider_path(app, tasks), args.repeat)
+
+    print(json.dumps(results, indent=2))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,118 @@
+"""Throughput of the development server vs. production mode.
+
+Starts `python run.py` once per mode on a local port, drives PATH with
+concurrent keep-alive clients and reports requests/s and latency percentiles.
+Endpoints that need a token can be benchmarked with --token.
+
+    python -m benchmarks.bench_serving --clients 32 --seconds 10
+    python -m benchmarks.bench_serving --path /tasks/getTask/ --token <jwt>
+"""
+import argparse
+import http.client
+import json
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+
+from benchmarks.stats import percentile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def start_server(mode, port, workers):
+    env = dict(os.environ, SERVER_MODE=mode, PORT=str(port))
+    if workers:
+        env['WEB_WORKERS'] = str(workers)
+    process = subprocess.Popen(
+        [sys.executable, 'run.py'], cwd=ROOT, env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        start_new_session=True  # the dev reloader and gunicorn both fork children
+    )
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        try:
+            connection = http.client.HTTPConnection('127.0.0.1', port, timeout=1)
+            connection.request('GET', '/')
+            connection.getresponse().read()
+            return process
+        except OSError:
+            time.sleep(0.2)
+    stop_server(process)
+    raise RuntimeError(f'{mode} server did not start on port {port}')
+
+def stop_server(process):
+    os.killpg(process.pid, signal.SIGTERM)
+    try:
+        process.wait(30)
+    except subprocess.TimeoutExpired:
+        os.killpg(process.pid, signal.SIGKILL)
+
+def drive(port, path, headers, clients, seconds):
+    latencies = []
+    errors = 0
+    lock = threading.Lock()
+    deadline = time.perf_counter() + seconds
+
+    def client():
+        nonlocal errors
+        connection = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+        local = []
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            try:
+                connection.request('GET', path, headers=headers)
+                response = connection.getresponse()
+                response.read()
+                ok = response.status < 500
+            except (OSError, http.client.HTTPException):
+                connection.close()
+                connection = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+                ok = False
+            if ok:
+                local.append(time.perf_counter() - start)
+            else:
+                with lock:
+                    errors += 1
+        with lock:
+            latencies.extend(local)
+
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'requests_per_sec': len(latencies) / seconds,
+        'p50_ms': percentile(latencies, 50) * 1000 if latencies else None,
+        'p95_ms': percentile(latencies, 95) * 1000 if latencies else None,
+        'p99_ms': percentile(latencies, 99) * 1000 if latencies else None
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--path', default='/')
+    parser.add_argument('--token', help='JWT sent as the Authorization header')
+    parser.add_argument('--clients', type=int, default=32)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--workers', type=int, help='WEB_WORKERS for production mode')
+    parser.add_argument('--port', type=int, default=8765)
+    args = parser.parse_args()
+
+    headers = {'Authorization': f'Bearer {args.token}'} if args.token else {}
+    results = {'path': args.path, 'clients': args.clients, 'cpu_count': os.cpu_count()}
+    for offset, mode in enumerate(('dev', 'production')):
+        port = args.port + offset
+        process = start_server(mode, port, args.workers)
+        try:
+            results[mode] = drive(port, args.path, headers, args.clients, args.seconds)
+        finally:
+            stop_server(process)
+
+    print(json.dumps(results, indent=2))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,286 @@
+"""Event stream load test.
+
+By default the app is served in production mode (one gunicorn gthread worker
+with --threads threads, or a gevent worker with --worker-class gevent) on a
+local port, backed by an in-memory mongomock database, and driven over real
+HTTP connections:
+
+  1. --subscribers clients open GET /tasks/stream and keep it open;
+  2. regular GET /tasks/getTask/ requests run against the same worker;
+  3. --events tasks are added and their delivery to the open streams timed.
+
+Streams beyond EVENT_MAX_STREAMS (default: half of the threads, or nine tenths
+of --connections under gevent) get a 503. Pass --max-streams higher than
+--threads to see the streams take every gthread thread and regular requests
+time out; a gevent worker holds thousands of streams and keeps serving them.
+
+--bus measures the EventBus alone with thousands of idle subscribers, each a
+thread blocked in Subscription.get() like a stream between events: memory per
+subscriber, publish cost and delivery latency.
+
+    python -m benchmarks.bench_sse --threads 8 --subscribers 16
+    python -m benchmarks.bench_sse --threads 8 --subscribers 16 --max-streams 1000
+    python -m benchmarks.bench_sse --worker-class gevent --subscribers 3000
+    python -m benchmarks.bench_sse --bus --subscribers 5000 --admins 50
+"""
+import argparse
+import http.client
+import json
+import os
+import resource
+import signal
+import socket
+import threading
+import time
+
+from benchmarks.stats import percentile
+from utils.events import EventBus
+
+def rss_kb():
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1])
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+def bench_bus(args):
+    threading.stack_size(256 * 1024)
+    bus = EventBus()
+    stop = threading.Event()
+    latencies = []
+    lock = threading.Lock()
+
+    def subscriber(name, is_admin):
+        subscription = bus.subscribe(name, is_admin)
+        try:
+            while not stop.is_set():
+                event = subscription.get(args.heartbeat)
+                if event is not None and not is_admin:
+                    with lock:
+                        latencies.append(time.perf_counter() - event['sent'])
+        finally:
+            bus.unsubscribe(subscription)
+
+    baseline = rss_kb()
+    start = time.perf_counter()
+    threads = [threading.Thread(target=subscriber, args=(f'user{i % args.users}', False), daemon=True)
+               for i in range(args.subscribers)]
+    threads += [threading.Thread(target=subscriber, args=('admin', True), daemon=True)
+                for _ in range(args.admins)]
+    for t in threads:
+        t.start()
+    while bus.subscriber_count() < len(threads):
+        time.sleep(0.01)
+    results = {
+        'subscribers': len(threads),
+        'subscribe_seconds': time.perf_counter() - start,
+        'rss_per_subscriber_kb': (rss_kb() - baseline) / len(threads)
+    }
+
+    publish_times = []
+    for i in range(args.events):
+        start = time.perf_counter()
+        bus.publish({'type': 'updated', 'sent': start}, [f'user{i % args.users}'])
+        publish_times.append(time.perf_counter() - start)
+        time.sleep(0.001)
+    time.sleep(0.5)
+
+    stop.set()
+    expected = args.events * (args.subscribers // args.users)
+    results.update({
+        'events': args.events,
+        'publish_p50_us': percentile(publish_times, 50) * 1e6,
+        'publish_p99_us': percentile(publish_times, 99) * 1e6,
+        'delivered': len(latencies),
+        'expected_deliveries': expected,
+        'delivery_p50_ms': percentile(latencies, 50) * 1000 if latencies else None,
+        'delivery_p99_ms': percentile(latencies, 99) * 1000 if latencies else None
+    })
+    return results
+
+def create_http_app(args):
+    """The app on one shared mongomock client, which the forked worker inherits with the seeded users."""
+    os.environ.setdefault('SECRET_KEY', 'sse-bench-secret-key-not-for-production')
+    os.environ.update(
+        SERVER_MODE='production', RATE_LIMIT_BACKEND='off', MAIL_OUTBOX_WORKER='false', HASH_WORKERS='0',
+        EVENT_HEARTBEAT=str(args.heartbeat), EVENT_MAX_STREAMS=str(args.max_streams)
+    )
+    import mongomock
+    import utils.mongo
+    client = mongomock.MongoClient()
+    utils.mongo.MongoClient = lambda *_, **__: client
+    from app import create_app
+    from utils.jwt_manager import encode_auth_token
+    app = create_app()
+    users = app.config['MONGO_DB'].User_management
+    admin_id = users.insert_one({"name": "admin", "name_lc": "admin", "email": "admin@bench.local", "role": 'admin'}).inserted_id
+    user_id = users.insert_one({"name": "bench", "name_lc": "bench", "email": "bench@bench.local", "role": 'user'}).inserted_id
+    with app.app_context():
+        return app, encode_auth_token(str(admin_id)), encode_auth_token(str(user_id))
+
+def serve_in_child(app, port, options):
+    from utils.server import ProductionServer
+    pid = os.fork()
+    if pid == 0:
+        options = dict(options, bind=f'127.0.0.1:{port}', workers=1, accesslog=None, graceful_timeout=1)
+        try:
+            ProductionServer(app, options).run()
+        finally:
+            os._exit(0)
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+            return pid
+        except OSError:
+            time.sleep(0.1)
+    os.kill(pid, signal.SIGKILL)
+    raise RuntimeError(f'server did not start on port {port}')
+
+class StreamClient(threading.Thread):
+    """One /tasks/stream connection; records the arrival time of each `created` event."""
+
+    def __init__(self, port, token, timeout):
+        super().__init__(daemon=True)
+        self.connection = http.client.HTTPConnection('127.0.0.1', port, timeout=timeout)
+        self.token = token
+        self.status = None
+        self.received = []
+        self.opened = threading.Event()
+
+    def run(self):
+        try:
+            self.connection.request('GET', '/tasks/stream', headers={'Authorization': f'Bearer {self.token}'})
+            sock = self.connection.sock  # detached from the connection when the server sends Connection: close
+            response = self.connection.getresponse()
+            self.status = response.status
+        except (OSError, http.client.HTTPException):
+            self.status = 'timeout'
+            return
+        finally:
+            self.opened.set()
+        if self.status != 200:
+            return
+        sock.settimeout(None)  # idle between events
+        try:
+            while True:
+                line = response.readline()
+                if not line:
+                    return
+                if line.startswith(b'event: created'):
+                    self.received.append(time.perf_counter())
+        except (OSError, ValueError, http.client.HTTPException):
+            return
+
+def timed_request(port, method, path, token, body=None, timeout=5):
+    connection = http.client.HTTPConnection('127.0.0.1', port, timeout=timeout)
+    headers = {'Authorization': f'Bearer {token}', 'Content-Type': 'application/json'}
+    start = time.perf_counter()
+    try:
+        connection.request(method, path, body=json.dumps(body) if body is not None else None, headers=headers)
+        response = connection.getresponse()
+        response.read()
+        return response.status, time.perf_counter() - start
+    except (OSError, http.client.HTTPException):
+        return 'timeout', time.perf_counter() - start
+    finally:
+        connection.close()
+
+def bench_http(args):
+    app, admin_token, user_token = create_http_app(args)
+    pid = serve_in_child(app, args.port, args.options)
+    try:
+        streams = [StreamClient(args.port, user_token, args.timeout) for _ in range(args.subscribers)]
+        for stream in streams:
+            stream.start()
+        for stream in streams:
+            stream.opened.wait()
+        open_streams = [stream for stream in streams if stream.status == 200]
+
+        latencies, failures = [], 0
+        deadline = time.perf_counter() + args.seconds
+        while time.perf_counter() < deadline:
+            status, latency = timed_request(args.port, 'GET', '/tasks/getTask/?limit=10', admin_token,
+                                            timeout=args.timeout)
+            if status in (200, 404):
+                latencies.append(latency)
+            else:
+                failures += 1
+
+        sent = []
+        task = {"title": "Bench", "description": "Event delivery", "status": "pending",
+                "assigned_to": "bench", "due_date": "2030-01-01", "priority": "Low"}
+        for _ in range(args.events):
+            start = time.perf_counter()
+            status, _ = timed_request(args.port, 'POST', '/tasks/addTask', admin_token, task, timeout=args.timeout)
+            if status == 201:
+                sent.append(start)
+            time.sleep(0.02)
+        time.sleep(0.5)
+        deliveries = [received - sent[i] for stream in open_streams
+                      for i, received in enumerate(stream.received[:len(sent)])]
+    finally:
+        os.kill(pid, signal.SIGTERM)
+        os.waitpid(pid, 0)
+
+    statuses = {}
+    for stream in streams:
+        statuses[str(stream.status)] = statuses.get(str(stream.status), 0) + 1
+    return {
+        'worker_class': args.worker_class,
+        'threads': args.threads,
+        'connections': args.connections,
+        'max_streams': args.max_streams,
+        'subscribers': {'requested': args.subscribers, 'status_counts': statuses},
+        'regular_requests': {
+            'requests': len(latencies) + failures,
+            'failed_or_timed_out': failures,
+            'p50_ms': percentile(latencies, 50) * 1000 if latencies else None,
+            'p99_ms': percentile(latencies, 99) * 1000 if latencies else None
+        },
+        'events': {
+            'sent': len(sent),
+            'expected_deliveries': len(sent) * len(open_streams),
+            'delivered': len(deliveries),
+            'delivery_p50_ms': percentile(deliveries, 50) * 1000 if deliveries else None,
+            'delivery_p99_ms': percentile(deliveries, 99) * 1000 if deliveries else None
+        }
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--bus', action='store_true', help='benchmark the EventBus alone, without HTTP')
+    parser.add_argument('--subscribers', type=int, help='open streams (default 16, or 5000 with --bus)')
+    parser.add_argument('--events', type=int, help='events published (default 50, or 1000 with --bus)')
+    parser.add_argument('--heartbeat', type=float, default=15.0)
+    parser.add_argument('--users', type=int, default=1000, help='--bus: distinct user names among the subscribers')
+    parser.add_argument('--admins', type=int, default=50, help='--bus: admin subscribers (receive every event)')
+    parser.add_argument('--worker-class', choices=['gthread', 'gevent'], default='gthread', help='WEB_WORKER_CLASS')
+    parser.add_argument('--threads', type=int, default=8, help='WEB_THREADS of a gthread worker')
+    parser.add_argument('--connections', type=int, default=1000, help='WEB_CONNECTIONS of a gevent worker')
+    parser.add_argument('--max-streams', type=int, help='EVENT_MAX_STREAMS (default: as in production mode)')
+    parser.add_argument('--seconds', type=float, default=5, help='duration of the regular request phase')
+    parser.add_argument('--timeout', type=float, default=5, help='seconds before a request counts as timed out')
+    parser.add_argument('--port', type=int, default=8775)
+    args = parser.parse_args()
+
+    if args.bus:
+        args.subscribers = args.subscribers or 5000
+        args.events = args.events or 1000
+        results = bench_bus(args)
+    else:
+        if args.worker_class == 'gevent':
+            # As run.py does; the stream clients then run as greenlets too
+            from gevent import monkey
+            monkey.patch_all()
+        from utils.server import default_event_streams, server_options
+        args.options = dict(server_options(), worker_class=args.worker_class, threads=args.threads,
+                            worker_connections=args.connections)
+        args.subscribers = args.subscribers or 16
+        args.events = args.events or 50
+        args.max_streams = args.max_streams or default_event_streams(args.options)
+        results = bench_http(args)
+    print(json.dumps(results, indent=2))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,355 @@
+"""Load test: seed a synthetic dataset, drive the API concurrently, report per endpoint.
+
+Seeds N users and M tasks, with comments and history, into MONGO_URI /
+--db-name. The existing documents in the seeded collections are deleted
+first, so never point it at real data. With --in-process the data lives in
+mongomock instead; no mongod is needed, but there is no text search and
+the numbers only show relative changes. The app is served in-process by a
+threaded WSGI server, or load goes to a running server with --url; that
+server must use the same database and have RATE_LIMIT_BACKEND=off.
+
+Prints one JSON report with requests/s, error counts and p50/p95/p99
+latency per endpoint. Runs with the same --seed produce the same dataset:
+ids and contents come from the seeded generator and dates are relative to
+START_TIME, not the clock (only the password hash salt differs).
+
+    python -m benchmarks.load_test --users 200 --tasks 20000 --clients 32 --seconds 30
+    python -m benchmarks.load_test --in-process --tasks 2000 --seconds 10
+    python -m benchmarks.load_test --mix list=50,search=20,add=10,update=10,comment=10,login=0
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+from urllib.parse import quote, urlparse
+
+from werkzeug.security import generate_password_hash
+
+from benchmarks.stats import percentile
+
+PASSWORD = 'Passw0rd!'
+STATUSES = ['pending', 'in_progress', 'done']
+PRIORITIES = ['Low', 'Medium', 'High']
+WORDS = ('report deploy invoice migrate review design budget audit client server release '
+         'backup onboarding roadmap security billing analytics support dashboard schema').split()
+SEEDED_COLLECTIONS = ('User_management', 'Task_management', 'Task_comments', 'Task_history',
+                      'Task_stats', 'Counters')
+DEFAULT_MIX = 'list=35,search=15,add=10,update=15,comment=15,login=10'
+START_TIME = datetime(2025, 1, 1)  # seeded dates are relative to this
+
+def sentence(rng, words):
+    return ' '.join(rng.choice(WORDS) for _ in range(words)).capitalize()
+
+def seeded_object_id(rng, created_at):
+    """ObjectId with the timestamp of `created_at` and the remaining 8 bytes drawn from `rng`."""
+    from bson import ObjectId
+    return ObjectId(ObjectId.from_datetime(created_at).binary[:4] + rng.randbytes(8))
+
+def insert_batches(collection, docs, batch_size=1000):
+    for start in range(0, len(docs), batch_size):
+        collection.insert_many(docs[start:start + batch_size], ordered=False)
+
+def seed_dataset(db, users, tasks, comments_per_task, history_per_task, seed):
+    """Replace the seeded collections with a synthetic dataset; returns the user names and task ids."""
+    from utils.migrations import COMMENT_PREVIEW_LENGTH
+    from utils.task_stats import rebuild_task_stats
+
+    rng = random.Random(seed)
+    for name in SEEDED_COLLECTIONS:
+        db[name].delete_many({})
+
+    password_hash = generate_password_hash(PASSWORD)  # one hash for everyone: seeding stays fast
+    names = ['admin'] + [f'user{i}' for i in range(1, users)]
+    user_ids = {name: seeded_object_id(rng, START_TIME) for name in names}
+    insert_batches(db.User_management, [{
+        "_id": user_ids[name],
+        "name": name,
+        "name_lc": name,
+        "email": f'{name}@bench.local',
+        "password": password_hash,
+        "role": 'admin' if name == 'admin' else 'user',
+        "token_version": 0
+    } for name in names])
+
+    now = START_TIME
+    task_docs, comment_docs, history_docs = [], [], []
+    for i in range(tasks):
+        task_id = seeded_object_id(rng, now - timedelta(minutes=tasks - i))
+        assignee = rng.choice(names)
+        priority = rng.choice(PRIORITIES)
+        comments = max(0, int(rng.expovariate(1 / comments_per_task))) if comments_per_task else 0
+        task = {
+            "_id": task_id,
+            "title": f'{sentence(rng, 3)} {i}',
+            "description": sentence(rng, rng.randint(8, 40)),
+            "status": rng.choice(STATUSES),
+            "assigned_to": assignee,
+            "assigned_to_lc": assignee,
+            "due_date": (now + timedelta(days=rng.randint(-30, 90))).strftime('%Y-%m-%d'),
+            "priority": PRIORITIES.index(priority) + 1,
+            "priority_label": priority,
+            "comment_count": comments,
+            "version": 1 + comments,
+            "updated_at": now
+        }
+        for c in range(comments):
+            author = rng.choice(names)
+            created_at = now - timedelta(minutes=comments - c)
+            comment = {
+                "_id": seeded_object_id(rng, created_at),
+                "task_id": task_id,
+                "text": sentence(rng, rng.randint(3, 30)),
+                "user": user_ids[author],
+                "author": author,
+                "createdAt": created_at
+            }
+            comment_docs.append(comment)
+            task["latest_comment"] = {
+                "text": comment["text"][:COMMENT_PREVIEW_LENGTH],
+                "author": comment["author"],
+                "createdAt": comment["createdAt"]
+            }
+        for h in range(history_per_task):
+            change_time = now - timedelta(hours=history_per_task - h)
+            history_docs.append({
+                "_id": seeded_object_id(rng, change_time),
+                "task_id": task_id,
+                "changed_by": rng.choice(names),
+                "change_time": change_time,
+                "changes": {"status": {"old_value": rng.choice(STATUSES), "new_value": task["status"]}}
+            })
+        task_docs.append(task)
+
+    insert_batches(db.Task_management, task_docs)
+    insert_batches(db.Task_comments, comment_docs)
+    insert_batches(db.Task_history, history_docs)
+    rebuild_task_stats(db)
+    return names, [task["_id"] for task in task_docs]
+
+class Client:
+    """One keep-alive HTTP connection acting as one logged-in user."""
+
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self.connection = http.client.HTTPConnection(host, port, timeout=60)
+        self.token = None
+
+    def request(self, method, path, body=None):
+        headers = {'Content-Type': 'application/json'}
+        if self.token:
+            headers['Authorization'] = f'Bearer {self.token}'
+        payload = json.dumps(body) if body is not None else None
+        try:
+            self.connection.request(method, path, body=payload, headers=headers)
+            response = self.connection.getresponse()
+            data = response.read()
+            return response.status, data
+        except (OSError, http.client.HTTPException):
+            self.connection.close()
+            self.connection = http.client.HTTPConnection(self.host, self.port, timeout=60)
+            return 0, b''
+
+    def login(self, name):
+        status, data = self.request('POST', '/auth/login', {'email': f'{name}@bench.local', 'password': PASSWORD})
+        if status == 200:
+            self.token = json.loads(data)['token']
+        return status
+
+class Scenarios:
+    """The requests in the mix; each returns (endpoint label, HTTP status)."""
+
+    def __init__(self, names, task_ids, rng):
+        self.names = names
+        self.task_ids = task_ids
+        self.rng = rng
+
+    def task_body(self):
+        return {
+            "title": sentence(self.rng, 3),
+            "description": sentence(self.rng, 12),
+            "status": self.rng.choice(STATUSES),
+            "assigned_to": self.rng.choice(self.names),
+            "due_date": (datetime.utcnow() + timedelta(days=self.rng.randint(1, 60))).strftime('%Y-%m-%d'),
+            "priority": self.rng.choice(PRIORITIES)
+        }
+
+    def login(self, client):
+        return 'POST /auth/login', client.login(self.rng.choice(self.names))
+
+    def list(self, client):
+        return 'GET /tasks/getTask/', client.request('GET', '/tasks/getTask/?limit=50')[0]
+
+    def search(self, client):
+        return 'GET /tasks/getTask/<text>', client.request('GET', f'/tasks/getTask/{quote(self.rng.choice(WORDS))}')[0]
+
+    def add(self, client):
+        return 'POST /tasks/addTask', client.request('POST', '/tasks/addTask', self.task_body())[0]
+
+    def update(self, client):
+        task_id = self.rng.choice(self.task_ids)
+        return 'PUT /tasks/updateTask/<id>', client.request('PUT', f'/tasks/updateTask/{task_id}', self.task_body())[0]
+
+    def comment(self, client):
+        task_id = self.rng.choice(self.task_ids)
+        body = {"text": sentence(self.rng, self.rng.randint(3, 30))}
+        return 'POST /tasks/addComment/<id>', client.request('POST', f'/tasks/addComment/{task_id}', body)[0]
+
+def parse_mix(spec):
+    mix = {}
+    for part in spec.split(','):
+        name, weight = part.split('=')
+        if not hasattr(Scenarios, name.strip()):
+            raise SystemExit(f'Unknown scenario: {name}')
+        mix[name.strip()] = float(weight)
+    return {name: weight for name, weight in mix.items() if weight > 0}
+
+def run_load(host, port, names, task_ids, mix, clients, seconds, seed):
+    samples = {}  # endpoint -> list of (latency, status)
+    lock = threading.Lock()
+    deadline = time.perf_counter() + seconds
+    scenario_names = list(mix)
+    weights = [mix[name] for name in scenario_names]
+
+    def worker(index):
+        rng = random.Random(seed * 1000 + index)
+        scenarios = Scenarios(names, task_ids, rng)
+        client = Client(host, port)
+        # Every client works as the admin so updates and comments are never refused
+        if client.login('admin') != 200:
+            return
+        local = {}
+        while time.perf_counter() < deadline:
+            scenario = rng.choices(scenario_names, weights)[0]
+            start = time.perf_counter()
+            if scenario == 'login':
+                # Logins use their own connection so the admin session is kept
+                login_client = Client(host, port)
+                endpoint, status = scenarios.login(login_client)
+                login_client.connection.close()
+            else:
+                endpoint, status = getattr(scenarios, scenario)(client)
+            local.setdefault(endpoint, []).append((time.perf_counter() - start, status))
+        with lock:
+            for endpoint, values in local.items():
+                samples.setdefault(endpoint, []).extend(values)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(clients)]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return samples, time.perf_counter() - started
+
+def summarize(samples, duration):
+    report = {}
+    for endpoint, values in sorted(samples.items()):
+        latencies = [latency for latency, status in values if 0 < status < 400 or status == 404]
+        statuses = {}
+        for _, status in values:
+            statuses[str(status)] = statuses.get(str(status), 0) + 1
+        report[endpoint] = {
+            'requests': len(values),
+            'errors': len(values) - len(latencies),
+            'status_counts': statuses,
+            'requests_per_sec': len(values) / duration,
+            'p50_ms': percentile(latencies, 50) * 1000 if latencies else None,
+            'p95_ms': percentile(latencies, 95) * 1000 if latencies else None,
+            'p99_ms': percentile(latencies, 99) * 1000 if latencies else None,
+            'max_ms': max(latencies) * 1000 if latencies else None
+        }
+    return report
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))).stdout.strip() or None
+    except OSError:
+        return None
+
+def create_bench_app(args):
+    os.environ.setdefault('SECRET_KEY', 'load-test-secret-key-not-for-production')
+    os.environ['MONGO_DB_NAME'] = args.db_name
+    os.environ['RATE_LIMIT_BACKEND'] = 'off'
+    os.environ['MAIL_OUTBOX_WORKER'] = 'false'
+    if args.in_process:
+        import mongomock
+        import utils.mongo
+        utils.mongo.MongoClient = mongomock.MongoClient
+    from app import create_app
+    return create_app()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=100)
+    parser.add_argument('--tasks', type=int, default=10000)
+    parser.add_argument('--comments', type=float, default=5, help='average comments per task')
+    parser.add_argument('--history', type=int, default=3, help='history entries per task')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--db-name', default='flask_db_bench', help='database to seed (its data is replaced)')
+    parser.add_argument('--in-process', action='store_true', help='use mongomock instead of a mongod')
+    parser.add_argument('--url', help='drive a running server instead of serving the app in-process')
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--seconds', type=float, default=20)
+    parser.add_argument('--mix', default=DEFAULT_MIX, help='scenario weights, e.g. ' + DEFAULT_MIX)
+    parser.add_argument('--output', help='also write the report to this file')
+    args = parser.parse_args()
+
+    if args.db_name == 'flask_db':
+        raise SystemExit('Refusing to seed the application database; pick another --db-name')
+    mix = parse_mix(args.mix)
+    skipped = {}
+    if args.in_process and 'search' in mix:
+        skipped['search'] = 'mongomock has no $text search'
+        del mix['search']
+
+    app = create_bench_app(args)
+    db = app.config['MONGO_DB']
+    started = time.perf_counter()
+    names, task_ids = seed_dataset(db, args.users, args.tasks, args.comments, args.history, args.seed)
+    seed_seconds = time.perf_counter() - started
+
+    server = None
+    if args.url:
+        target = urlparse(args.url)
+        host, port = target.hostname, target.port or 80
+    else:
+        from werkzeug.serving import make_server
+        server = make_server('127.0.0.1', 0, app, threaded=True)
+        host, port = '127.0.0.1', server.server_port
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    try:
+        samples, duration = run_load(host, port, names, task_ids, mix, args.clients, args.seconds, args.seed)
+    finally:
+        if server is not None:
+            server.shutdown()
+
+    report = {
+        'revision': git_revision(),
+        'python': sys.version.split()[0],
+        'cpu_count': os.cpu_count(),
+        'backend': 'mongomock' if args.in_process else 'mongod',
+        'dataset': {
+            'users': args.users, 'tasks': args.tasks, 'comments_per_task': args.comments,
+            'history_per_task': args.history, 'seed': args.seed, 'seed_seconds': seed_seconds
+        },
+        'load': {'clients': args.clients, 'seconds': duration, 'mix': mix, 'skipped': skipped},
+        'total_requests_per_sec': sum(len(values) for values in samples.values()) / duration,
+        'endpoints': summarize(samples, duration)
+    }
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,7 @@
+"""Helpers shared by the benchmark scripts."""
+
+def percentile(values, pct):
+    """Nearest-rank percentile (0-100) of a non-empty sequence."""
+    values = sorted(values)
+    index = min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))
+    return values[index]
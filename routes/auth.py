@@ -2,6 +2,7 @@ from flask import Blueprint, jsonify, request, current_app
 from utils.hashing import hash_password, verify_password
 from utils.validate.helpers import email_exists, validate_user_data
 from utils.jwt_manager import encode_auth_token, decode_auth_token, token_required
+from utils.rate_limit import rate_limit
 
 auth_bp = Blueprint('auth', __name__)
 
@@ -13,6 +14,7 @@ def get_user_management():
 
 # Login
 @auth_bp.route("/login", methods=["POST"])
+@rate_limit('login')
 def login():
     data = request.get_json()
     usermail = data.get("email").lower()
@@ -22,7 +24,12 @@ def login():
     user = User_management.find_one({"email": usermail})
 
     if user and verify_password(password, user['password']):
-        token = encode_auth_token(str(user['_id']))
+        token = encode_auth_token(
+            str(user['_id']),
+            role=user.get('role'),
+            name=user.get('name'),
+            token_version=user.get('token_version', 0)
+        )
         if token:
             user_data = {
                 "id": str(user['_id']),
@@ -65,6 +72,7 @@ def register():
     User_management = get_user_management()
     User_management.insert_one({
         "name": name,
+        "name_lc": name.lower(),
         "email": email,
         "password": hashed_password,
         "role": "user"  # Default role for new users
@@ -81,6 +89,7 @@ def logout(user_id):
     return resp, 200
 
 @auth_bp.route("/email_check", methods=["POST"])
+@rate_limit('email_check')
 def email_check():
     # Extract JSON data from the request
     data = request.get_json()
@@ -1,20 +1,25 @@
 import random
 import string
-from flask import Blueprint, current_app, jsonify, request
-from flask_mail import Message
-from datetime import datetime, timedelta
+from bson import ObjectId
+from flask import Blueprint, jsonify, request
 
 from utils.hashing import hash_password
 from routes.users import get_user_management
 from utils.validate.helpers import validate_user_data
+from utils.user_loader import invalidate_user
+from utils.mail_outbox import enqueue_mail, get_mail_status
+from utils.token_store import get_token_store
+from utils.rate_limit import rate_limit
 mail_bp = Blueprint('mail', __name__)
 
-# In-memory storage for OTPs with expiration
-otp_store = {}  # Format: {email: (otp, timestamp)}
-reset_token_store = {}
+# OTPs and reset tokens live in the token store (see utils/token_store.py),
+# which expires them on its own and is shared by all workers
+OTP_TTL = 5 * 60  # 5-minute expiration
+RESET_TOKEN_TTL = 60 * 60  # 1-hour expiration
 
 # Route to send OTP
 @mail_bp.route('/send_otp', methods=['POST'])
+@rate_limit('send_otp')
 def send_otp():
     email = request.json.get('email')
     
@@ -24,17 +29,13 @@ def send_otp():
     # Generate a random 6-digit OTP
     otp = random.randint(100000, 999999)
     
-    # Create the email message
-    msg = Message('Your OTP Code', sender=current_app.config['MAIL_USERNAME'], recipients=[email])
-    msg.body = f'Your OTP code for Task app is {otp}'
-
-    # Store OTP with current timestamp
-    otp_store[email] = (otp, datetime.now())
+    # Store OTP; it expires on its own after OTP_TTL
+    get_token_store().put('otp', email, otp, OTP_TTL)
     
     try:
-        # Send the email
-        current_app.extensions['mail'].send(msg)
-        return jsonify({'message': 'OTP sent successfully'})
+        # Queue the email; the outbox worker delivers it in the background
+        mail_id = enqueue_mail('Your OTP Code', [email], f'Your OTP code for Task app is {otp}')
+        return jsonify({'message': 'OTP sent successfully', 'mail_id': mail_id})
     except Exception as e:
         print(e)
         return jsonify({'error': 'Failed to send OTP'}), 500
@@ -53,28 +54,27 @@ def verify_otp():
         user_otp = int(user_otp)
     except ValueError:
         return jsonify({'success': False, 'message': 'Invalid OTP format'}), 400
-    # Fetch OTP and timestamp from store
-    stored_otp, timestamp = otp_store.get(email, (None, None))
-    current_time = datetime.now()
+    # Fetch OTP from store (expired OTPs are never returned)
+    token_store = get_token_store()
+    stored_otp = token_store.get('otp', email)
     
-    ## Check if OTP exists and is within expiration time
-    if stored_otp and stored_otp == user_otp:
-        if current_time - timestamp < timedelta(minutes=5):  # 5-minute expiration
-            del otp_store[email]  # Clear OTP after successful verification
-            return jsonify({'success': True, 'message': 'OTP verified successfully'})
-        else:
-            return jsonify({'success': False, 'message': 'OTP expired'}), 400
+    ## Check if OTP matches; pop() clears it so it can only be used once
+    if stored_otp and stored_otp == user_otp and token_store.pop('otp', email) is not None:
+        return jsonify({'success': True, 'message': 'OTP verified successfully'})
     else:
-        return jsonify({'success': False, 'message': 'Invalid OTP'}), 400
+        return jsonify({'success': False, 'message': 'Invalid or expired OTP'}), 400
     
     # Route to request password reset
 @mail_bp.route('/request_reset', methods=['POST'])
+@rate_limit('request_reset')
 def request_reset():
     email = request.json.get('email')
 
 
     if not email:
         return jsonify({'error': 'Email is required'}), 400
+
+    email = email.lower()
     
     User_management = get_user_management()
     user = User_management.find_one({"email": email})
@@ -86,18 +86,19 @@ def request_reset():
     # Generate a secure token for password reset
     reset_token = ''.join(random.choices(string.ascii_letters + string.digits, k=32))
     
-    # Create the email message
     reset_link = f'https://localhost:3000/reset?token={reset_token}'
-    msg = Message('Password Reset Request', sender=current_app.config['MAIL_USERNAME'], recipients=[email])
-    msg.body = f'Click the link below to reset your password:\n\n{reset_link}'
 
-    # Store the reset token with current timestamp
-    reset_token_store[reset_token] = (email, datetime.now())
+    # Store the reset token; it expires on its own after RESET_TOKEN_TTL
+    get_token_store().put('reset', reset_token, email, RESET_TOKEN_TTL)
 
     try:
-        # Send the email
-        current_app.extensions['mail'].send(msg)
-        return jsonify({'message': 'Password reset email sent successfully'})
+        # Queue the email; the outbox worker delivers it in the background
+        mail_id = enqueue_mail(
+            'Password Reset Request',
+            [email],
+            f'Click the link below to reset your password:\n\n{reset_link}'
+        )
+        return jsonify({'message': 'Password reset email sent successfully', 'mail_id': mail_id})
     except Exception as e:
         print(e)
         return jsonify({'error': 'Failed to send reset email'}), 500
@@ -106,51 +107,61 @@ def request_reset():
 def reset_password():
     token = request.json.get('token')
     new_password = request.json.get('password')
-    print(token, new_password)
     
     if not token or not new_password:
         return jsonify({'msg': 'Token and new password are required'}), 400
 
-    # Fetch token and timestamp from store
-    stored_email, timestamp = reset_token_store.get(token, (None, None))
-    current_time = datetime.now()
-    print(stored_email, reset_token_store)
-
-    # Check if token exists and is within expiration time
-    if stored_email:
-        if current_time - timestamp < timedelta(hours=1):  # 1-hour expiration
-            # Remove the token after successful use
-            del reset_token_store[token]
-            
-            # Fetch user details from the database using the email
-            User_management = get_user_management()
-            user = User_management.find_one({"email": stored_email})
-            
-            if not user:
-                return jsonify({'error': 'User not found'}), 404
-
-            # Extract the user's name
-            name = user.get("name", "")
-            
-            # Validate the new password
-            error_msg, status_code = validate_user_data(name=name, email=stored_email, password=new_password)
-            if error_msg:
-                return jsonify({'msg': error_msg}), status_code
-            
-            # Hash the new password
-            hashed_password = hash_password(new_password)
-
-            # Update the user's password in the database
-            result = User_management.update_one(
-                {"email": stored_email},
-                {'$set': {"password": hashed_password}}
-            )
-            
-            if result.matched_count > 0:
-                return jsonify({'success': True, 'msg': 'Password reset successfully'}), 200
-            else:
-                return jsonify({'success': False, 'msg': 'Failed to update password'}), 500
-        else:
-            return jsonify({'success': False, 'msg': 'Reset token expired'}), 400
+    # Atomically take the token from the store so it can only be used once
+    stored_email = get_token_store().pop('reset', token)
+    if not stored_email:
+        return jsonify({'success': False, 'msg': 'Invalid or expired token'}), 400
+
+    # Fetch user details from the database using the email
+    User_management = get_user_management()
+    user = User_management.find_one({"email": stored_email})
+    
+    if not user:
+        return jsonify({'error': 'User not found'}), 404
+
+    # Extract the user's name
+    name = user.get("name", "")
+    
+    # Validate the new password
+    error_msg, status_code = validate_user_data(name=name, email=stored_email, password=new_password)
+    if error_msg:
+        return jsonify({'msg': error_msg}), status_code
+    
+    # Hash the new password
+    hashed_password = hash_password(new_password)
+
+    # Update the user's password in the database
+    result = User_management.update_one(
+        {"email": stored_email},
+        {'$set': {"password": hashed_password}, '$inc': {"token_version": 1}}
+    )
+    invalidate_user(user["_id"])
+    
+    if result.matched_count > 0:
+        return jsonify({'success': True, 'msg': 'Password reset successfully'}), 200
     else:
-        return jsonify({'success': False, 'msg': 'Invalid token'}), 400
\ No newline at end of file
+        return jsonify({'success': False, 'msg': 'Failed to update password'}), 500
+
+# Route to check the delivery status of a queued email (unauthenticated, so no error details)
+@mail_bp.route('/status/<mail_id>', methods=['GET'])
+def mail_status(mail_id):
+    try:
+        mail_id = ObjectId(mail_id)
+    except Exception:
+        return jsonify({'error': 'Invalid mail id'}), 400
+
+    status = get_mail_status(mail_id)
+    if not status:
+        return jsonify({'error': 'Mail not found'}), 404
+
+    return jsonify({
+        'mail_id': status['_id'],
+        'status': status['status'],
+        'attempts': status.get('attempts', 0),
+        'created_at': status['created_at'],
+        'sent_at': status.get('sent_at')
+    })
@@ -1,41 +1,104 @@
 # models/tasks.py (or similar)
 from datetime import datetime
 from bson import ObjectId
-import re
-from flask import Blueprint, jsonify, request, current_app
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError
+from flask import Blueprint, Response, jsonify, request, current_app, stream_with_context
 from routes.users import get_user_management
 from utils.jwt_manager import token_required
-from utils.validate.helpers import validate_task_data
+from utils.user_loader import load_identity
+from utils.events import get_event_bus, publish_task_event
+from utils.etag import bump_tasks_version, make_etag, not_modified, tasks_version, with_etag
+from utils.role_decorator import role_required
+from utils.task_stats import read_task_stats, rebuild_task_stats, update_task_stats
+from utils.streaming import export_response
+from utils.projection import fields_projection, parse_fields
+from utils.pagination import decode_cursor, encode_cursor, keyset_filter, next_keyset_cursor, parse_limit
+from utils.migrations import COMMENT_PREVIEW_LENGTH
+from utils.validate.helpers import validate_task_data, validate_task_patch, validate_task_types
 
 tasks_bp = Blueprint('tasks', __name__)
 
+SEARCH_PAGE_SIZE = 20
+MAX_BULK_ITEMS = 1000
+EXPORT_BATCH_SIZE = 1000
+MAX_EXPORT_BATCH_SIZE = 10000
+# Fields the task listing endpoints can return (`fields=`), and the document
+# field an API field is read from when the names differ
+TASK_LIST_FIELDS = [
+    "_id", "title", "description", "status", "assigned_to", "due_date", "priority",
+    "comment_count", "latest_comment", "version", "updated_at"
+]
+TASK_FIELD_MAP = {"priority": "priority_label"}
+EXPORT_FIELDS = ["_id", "title", "description", "status", "assigned_to", "due_date", "priority", "comment_count"]
+TASK_FIELDS = ["title", "description", "status", "assigned_to", "due_date", "priority"]
+PRIORITY_MAPPING = {
+    'Low': 1,
+    'Medium': 2,
+    'High': 3
+}
+# Task fields recorded in the history, mapped to the document field holding their display value
+HISTORY_FIELDS = {
+    "title": "title",
+    "description": "description",
+    "status": "status",
+    "assigned_to": "assigned_to",
+    "due_date": "due_date",
+    "priority": "priority_label"
+}
+# Fields patch_task reads from the previous task besides the changed ones: the
+# old assignee (events) and the statistics dimensions
+PATCH_BASE_PROJECTION = {"assigned_to": 1, "assigned_to_lc": 1, "status": 1, "priority_label": 1, "version": 1}
+# Fields update_task compares against the request to build the history entry
+TASK_DIFF_PROJECTION = {
+    "title": 1, "description": 1, "status": 1,
+    "assigned_to": 1, "due_date": 1, "priority_label": 1
+}
+MAX_SEARCH_RESULTS = 1000
+
 #Task managemenet collection
 def get_task_management():
     return current_app.config['MONGO_DB'].Task_management
 
+#Task comments collection
+def get_task_comments():
+    return current_app.config['MONGO_DB'].Task_comments
+
+#Append-only task history (audit log) collection
+def get_task_history_log():
+    return current_app.config['MONGO_DB'].Task_history
+
 #handle Error response
 def error_response(message, status_code):
     return jsonify({'error': message}), status_code
 
-# serialize_objectid for comments 
-def serialize_objectid(obj):
-    if isinstance(obj, ObjectId):
-        return str(obj)
-    elif isinstance(obj, dict):
-        return {k: serialize_objectid(v) for k, v in obj.items()}
-    elif isinstance(obj, list):
-        return [serialize_objectid(item) for item in obj]
-    else:
-        return obj
+# API representation of a task, limited to `fields` when given; ObjectId/datetime
+# values are encoded by the JSON provider
+def format_task(task, fields=None):
+    formatted = {
+        "_id": task.get("_id"),
+        "title": task.get("title"),
+        "description": task.get("description"),
+        "status": task.get("status"),
+        "assigned_to": task.get("assigned_to"),
+        "due_date": task.get("due_date"),
+        "priority": task.get("priority_label"),  # Use priority_label for display
+        "comment_count": task.get("comment_count", 0),
+        "latest_comment": task.get("latest_comment"),  # Short preview of the newest comment
+        "version": task.get("version", 0),
+        "updated_at": task.get("updated_at")
+    }
+    if fields is None:
+        return formatted
+    return {field: formatted[field] for field in fields}
 
-#get all Tasks
+#get all Tasks (keyset pagination on priority, _id)
 @tasks_bp.route("/getTask/", methods=["GET"])
 @token_required
 def get_tasks(user_id):
     Task_management = get_task_management()
-    user_collection = get_user_management()
 
-    user = user_collection.find_one({"_id": ObjectId(user_id)})
+    user = load_identity(user_id)
     
     if not user:
         return jsonify({'msg': 'User not found'}), 404
@@ -43,92 +106,200 @@ def get_tasks(user_id):
     user_role = user.get("role")
     user_name = user.get("name").lower()  # Normalize case for comparison
 
+    limit = parse_limit(request.args.get("limit"))
+    if limit is None:
+        return jsonify({'msg': "Invalid limit"}), 400
+
+    fields = parse_fields(request.args.get("fields"), TASK_LIST_FIELDS, TASK_LIST_FIELDS)
+    if fields is None:
+        return jsonify({'msg': f"Invalid fields. Allowed: {', '.join(TASK_LIST_FIELDS)}"}), 400
+
+    # Answer polls with 304 from the collection version, before running the query.
+    # Role and name decide which tasks are listed, so they are part of the ETag
+    etag = make_etag(tasks_version(), user_id, user_role, user_name, request.full_path)
+    cached = not_modified(etag)
+    if cached:
+        return cached
+
     if user_role == 'admin':
-        tasks_cursor = Task_management.find().sort("priority", -1)  # Ascending order
+        query = {}
     else:
-        tasks_cursor = Task_management.find({"assigned_to": {"$regex": f"^{user_name}$", "$options": "i"}}).sort("priority", -1)
-
-    tasks = []
-    for task in tasks_cursor:
-        tasks.append({
-            "_id": str(task["_id"]),  # Convert ObjectId to string
-            "title": task.get("title"),
-            "description": task.get("description"),
-            "status": task.get("status"),
-            "assigned_to": task.get("assigned_to"),
-            "due_date": task.get("due_date"),
-            "priority": task.get("priority_label"),  # Use priority_label for display
-            "comments": serialize_objectid(task.get("comments", []))  # Include comments
-        })
-
-    if tasks:
-        return jsonify(tasks), 200
+        query = {"assigned_to_lc": user_name}
+
+    cursor_token = request.args.get("cursor")
+    if cursor_token:
+        cursor = decode_cursor(cursor_token)
+        page_filter = keyset_filter(cursor, "priority") if cursor else None
+        if page_filter is None:
+            return jsonify({'msg': "Invalid cursor"}), 400
+        query.update(page_filter)
+
+    # Read only the requested fields, plus the keyset cursor fields (numeric priority, _id).
+    # Fetch one extra document to know whether another page exists
+    projection = fields_projection(fields, TASK_FIELD_MAP, required=("priority", "_id"))
+    tasks_cursor = Task_management.find(query, projection).sort([("priority", -1), ("_id", -1)]).limit(limit + 1)
+    docs = list(tasks_cursor)
+
+    next_cursor = None
+    if len(docs) > limit:
+        docs = docs[:limit]
+        next_cursor = next_keyset_cursor(docs[-1], "priority")
+
+    tasks = [format_task(task, fields) for task in docs]
+
+    if tasks or cursor_token:
+        return with_etag(jsonify({'tasks': tasks, 'next_cursor': next_cursor}), etag), 200
     else:
         return jsonify({'msg': "You don't have any tasks assigned to you."}), 404
 
 
-#get Task by title or description
+#Search tasks by title or description (ranked full-text search)
 @tasks_bp.route("/getTask/<string:title>", methods=["GET"])
 @token_required
 def get_task(user_id, title):
     try:
         Task_management = get_task_management()
-        user_collection = get_user_management()
 
         # Get user details
-        user = user_collection.find_one({"_id": ObjectId(user_id)})
+        user = load_identity(user_id)
         if not user:
             return jsonify({'msg': 'User not found'}), 404
 
         user_role = user.get("role")
         user_name = user.get("name").lower()  # Normalize case for comparison
 
-        # Sanitize the title and description to handle special characters
-        sanitized_title = re.escape(title)
-        sanitized_description = re.escape(title)
-
-        # Construct query based on user role and provided filters
-        if user_role == 'admin':
-            query = {
-                "$or": [
-                    {"title": {"$regex": sanitized_title, "$options": "i"}},
-                    {"description": {"$regex": sanitized_description, "$options": "i"}}
-                ]
-            }
-            if sanitized_description:
-                query["description"] = {"$regex": sanitized_description, "$options": "i"}
-        else:
-            query = {
-                "$or": [
-                    {"title": {"$regex": sanitized_title, "$options": "i"}},
-                    {"description": {"$regex": sanitized_description, "$options": "i"}}
-                ],
-                "assigned_to": {"$regex": f"^{user_name}$", "$options": "i"}
-            }
-
-        # Fetch tasks based on the query
-        tasks = Task_management.find(query).sort("priority", -1)
-        tasks_list = []
-        for task in tasks:
-            tasks_list.append({
-                "_id": str(task["_id"]),  # Convert ObjectId to string
-                "title": task.get("title"),
-                "description": task.get("description"),
-                "status": task.get("status"),
-                "assigned_to": task.get("assigned_to"),
-                "due_date": task.get("due_date"),
-                "priority": task.get("priority_label"),  # Use priority_label for display
-                "comments": serialize_objectid(task.get("comments", []))  # Include comments
-            })
-
-        if tasks_list:
-            return jsonify(tasks_list), 200
+        limit = parse_limit(request.args.get("limit"), default=SEARCH_PAGE_SIZE)
+        if limit is None:
+            return jsonify({'msg': "Invalid limit"}), 400
+
+        fields = parse_fields(request.args.get("fields"), TASK_LIST_FIELDS, TASK_LIST_FIELDS)
+        if fields is None:
+            return jsonify({'msg': f"Invalid fields. Allowed: {', '.join(TASK_LIST_FIELDS)}"}), 400
+
+        offset = 0
+        cursor_token = request.args.get("cursor")
+        if cursor_token:
+            cursor = decode_cursor(cursor_token)
+            offset = cursor.get("o") if cursor else None
+            if not isinstance(offset, int) or offset < 0:
+                return jsonify({'msg': "Invalid cursor"}), 400
+
+        etag = make_etag(tasks_version(), user_id, user_role, user_name, request.full_path)
+        cached = not_modified(etag)
+        if cached:
+            return cached
+
+        # Full-text search served by the task_text_search index, best matches first
+        query = {"$text": {"$search": title}}
+        if user_role != 'admin':
+            query["assigned_to_lc"] = user_name
+
+        # Ranking is computed over every match, so only the top results are reachable
+        limit = min(limit, MAX_SEARCH_RESULTS - offset)
+        if limit <= 0:
+            return with_etag(jsonify({'tasks': [], 'next_cursor': None}), etag), 200
+
+        projection = fields_projection(fields, TASK_FIELD_MAP)
+        projection["score"] = {"$meta": "textScore"}
+        tasks = Task_management.find(query, projection).sort([
+            ("score", {"$meta": "textScore"}),
+            ("priority", -1),
+            ("_id", -1)
+        ]).skip(offset).limit(limit + 1)
+        docs = list(tasks)
+
+        next_cursor = None
+        if len(docs) > limit:
+            docs = docs[:limit]
+            next_cursor = encode_cursor({"o": offset + limit})
+
+        tasks_list = [format_task(task, fields) for task in docs]
+
+        if tasks_list or cursor_token:
+            return with_etag(jsonify({'tasks': tasks_list, 'next_cursor': next_cursor}), etag), 200
         else:
             return jsonify({'msg': "No tasks found with the specified criteria."}), 404
 
     except Exception as e:
         return jsonify({'msg': f"An error occurred: {str(e)}"}), 500
  
+#Export tasks as NDJSON or CSV, streamed straight from the cursor
+@tasks_bp.route("/export", methods=["GET"])
+@token_required
+def export_tasks(user_id):
+    user = load_identity(user_id)
+    if not user:
+        return jsonify({'msg': 'User not found'}), 404
+
+    file_format = request.args.get("format", "ndjson")
+    if file_format not in ("ndjson", "csv"):
+        return jsonify({'msg': "Unsupported format. Use ndjson or csv"}), 400
+
+    fields = parse_fields(request.args.get("fields"), EXPORT_FIELDS, EXPORT_FIELDS)
+    if fields is None:
+        return jsonify({'msg': f"Invalid fields. Allowed: {', '.join(EXPORT_FIELDS)}"}), 400
+
+    batch_size = parse_limit(request.args.get("batch_size"), default=EXPORT_BATCH_SIZE, maximum=MAX_EXPORT_BATCH_SIZE)
+    if batch_size is None:
+        return jsonify({'msg': "Invalid batch_size"}), 400
+
+    query = {} if user.get("role") == 'admin' else {"assigned_to_lc": user.get("name").lower()}
+    cursor = get_task_management().find(query, fields_projection(fields, TASK_FIELD_MAP)).sort("_id", 1).batch_size(batch_size)
+
+    return export_response(cursor, fields, file_format, "tasks", TASK_FIELD_MAP)
+
+#Task statistics, served from the Task_stats counters
+@tasks_bp.route("/stats", methods=["GET"])
+@token_required
+@role_required(['admin'])
+def get_task_stats(user_id):
+    return jsonify(read_task_stats()), 200
+
+#Recompute the statistics counters from the tasks (repair)
+@tasks_bp.route("/stats/rebuild", methods=["POST"])
+@token_required
+@role_required(['admin'])
+def rebuild_stats(user_id):
+    rebuild_task_stats(current_app.config['MONGO_DB'])
+    return jsonify(read_task_stats()), 200
+
+#Server-Sent Events stream of changes to the user's tasks (all tasks for admins)
+@tasks_bp.route("/stream", methods=["GET"])
+@token_required
+def stream_tasks(user_id):
+    user = load_identity(user_id)
+    if not user:
+        return jsonify({'msg': 'User not found'}), 404
+
+    bus = get_event_bus()
+    subscription = bus.subscribe(user.get("name").lower(), user.get("role") == 'admin')
+    if subscription is None:
+        # Each stream holds a request thread; refuse before regular requests are starved
+        resp = jsonify({'msg': 'Too many open event streams, please try again later'})
+        resp.headers['Retry-After'] = '30'
+        return resp, 503
+    heartbeat = current_app.config.get('EVENT_HEARTBEAT', 15)
+
+    def generate():
+        yield "retry: 5000\n\n"
+        while True:
+            event = subscription.get(heartbeat)
+            if subscription.overflowed:
+                # Too slow to keep up: the client must re-fetch and reconnect
+                yield "event: resync\ndata: {}\n\n"
+                return
+            if event is None:
+                yield ": keep-alive\n\n"
+                continue
+            yield f"event: {event['type']}\ndata: {current_app.json.dumps(event)}\n\n"
+
+    response = Response(stream_with_context(generate()), mimetype="text/event-stream")
+    # Runs when the server closes the response, even if the stream never started
+    response.call_on_close(lambda: bus.unsubscribe(subscription))
+    response.headers["Cache-Control"] = "no-cache"
+    response.headers["X-Accel-Buffering"] = "no"  # Disable proxy buffering (nginx)
+    return response
+
 #Add Task
 @tasks_bp.route("/addTask", methods=["POST"])
 @token_required
@@ -136,82 +307,284 @@ def add_task(user_id):
     Task_management = get_task_management()
     User_management = get_user_management()
 
-
     data = request.get_json()
-    required_fields = ["title", "description", "status", "assigned_to", "due_date", "priority"]
-
-    if not all(field in data for field in required_fields):
-        return jsonify({'msg': "Missing fields in request"}), 400
+    error_message, status_code = validate_task_item(data)
+    if error_message:
+        return jsonify({'msg': error_message}), status_code
 
-    title = data["title"]
-    description = data["description"]
-    status = data["status"]
     assigned_to = data["assigned_to"]
-    due_date = data["due_date"]
-    priority = data["priority"]
+    assigned_user = User_management.find_one({"name_lc": assigned_to.lower()})
+    if not assigned_user:
+        return jsonify({'msg': "Assigned user not found"}), 404
+
+    # Add the task, then its creation record in the audit log
+    task = new_task(data)
+    result = Task_management.insert_one(task)
+    update_task_stats(added=[task])
+    get_task_history_log().insert_one({
+        "task_id": result.inserted_id,
+        "changed_by": "System",  # or "Admin" if preferred
+        "change_time": datetime.utcnow(),
+        "changes": collect_changes({}, data)
+    })
+    bump_tasks_version()
+    publish_task_event("created", result.inserted_id, [assigned_to], version=1)
+    return jsonify({'msg': "Task Added Successfully"}), 201
 
-    priority_mapping = {
-        'Low': 1,
-        'Medium': 2,
-        'High': 3
+# History "changes" between a stored task (only display fields needed) and new values
+def collect_changes(task, values):
+    changes = {}
+    for field, doc_field in HISTORY_FIELDS.items():
+        if field in values and task.get(doc_field) != values[field]:
+            changes[field] = {
+                "old_value": task.get(doc_field),
+                "new_value": values[field]
+            }
+    return changes
+
+# Stored fields for validated request values
+def task_fields(values):
+    return {
+        "title": values["title"],
+        "description": values["description"],
+        "status": values["status"],
+        "assigned_to": values["assigned_to"],
+        "assigned_to_lc": values["assigned_to"].lower(),  # Normalized for indexed lookups
+        "due_date": values["due_date"],
+        "priority": PRIORITY_MAPPING.get(values["priority"], 1),  # Numeric value for sorting
+        "priority_label": values["priority"]  # String label for display
     }
-    
-    priority_numeric = priority_mapping.get(priority, 1)  # Default to 'Low' if not found
-    priority_label = priority  # Use the provided label for display
 
-    error_message, status_code = validate_task_data(title, description, status, assigned_to, due_date, priority_numeric)
+# A new task document for validated request values
+def new_task(values):
+    task = task_fields(values)
+    task["comment_count"] = 0  # Comments are stored in Task_comments
+    task["version"] = 1  # Incremented on every write, used for ETags
+    task["updated_at"] = datetime.utcnow()
+    return task
+
+# Validate a full task body (addTask, updateTask and bulk items); returns (message, status code)
+def validate_task_item(item):
+    if not isinstance(item, dict) or not all(field in item for field in TASK_FIELDS):
+        return "Missing fields in request", 400
+    error_message, status_code = validate_task_types({field: item[field] for field in TASK_FIELDS})
     if error_message:
-        return jsonify({'msg': error_message}), status_code
-    
-    user_query = {"name": re.compile(f"^{re.escape(assigned_to)}$", re.IGNORECASE)}
-    assigned_user = User_management.find_one(user_query)
-    if not assigned_user:
-        return jsonify({'msg': "Assigned user not found"}), 404
+        return error_message, status_code
+    return validate_task_data(
+        item["title"], item["description"], item["status"],
+        item["assigned_to"], item["due_date"], item["priority"]
+    )
+
+# Validate a bulk item; returns an error result or None
+def validate_bulk_item(index, item):
+    error_message, status_code = validate_task_item(item)
+    if error_message:
+        return {'index': index, 'status': status_code, 'msg': error_message}
+    return None
+
+# Names (lower-cased) of the users that exist among the given assignees, in one query
+def resolve_assignees(items):
+    names = list({item["assigned_to"].lower() for item in items})
+    users = get_user_management().find({"name_lc": {"$in": names}}, {"name_lc": 1})
+    return {user["name_lc"] for user in users}
+
+def read_bulk_body():
+    data = request.get_json(silent=True)
+    if not isinstance(data, list) or not data:
+        return None, (jsonify({'msg': "Request body must be a non-empty array"}), 400)
+    if len(data) > MAX_BULK_ITEMS:
+        return None, (jsonify({'msg': f"At most {MAX_BULK_ITEMS} items per request"}), 400)
+    return data, None
+
+#Bulk add tasks
+@tasks_bp.route("/bulkAdd", methods=["POST"])
+@token_required
+def bulk_add_tasks(user_id):
+    data, error = read_bulk_body()
+    if error:
+        return error
+
+    results = [None] * len(data)
+    valid = []
+    for index, item in enumerate(data):
+        results[index] = validate_bulk_item(index, item)
+        if results[index] is None:
+            valid.append((index, item))
+
+    known_assignees = resolve_assignees([item for _, item in valid]) if valid else set()
+    pending = []  # (index, values, document)
+    for index, item in valid:
+        if item["assigned_to"].lower() not in known_assignees:
+            results[index] = {'index': index, 'status': 404, 'msg': "Assigned user not found"}
+            continue
+        pending.append((index, item, new_task(item)))
+
+    # insert_many assigns the _ids client-side; failed positions come back as write errors
+    failed = {}
+    if pending:
+        try:
+            get_task_management().insert_many([document for _, _, document in pending], ordered=False)
+        except BulkWriteError as e:
+            failed = {error["index"]: error.get("errmsg", "Write failed") for error in e.details.get("writeErrors", [])}
+
+    now = datetime.utcnow()
+    history = []
+    inserted = []
+    for position, (index, item, document) in enumerate(pending):
+        if position in failed:
+            results[index] = {'index': index, 'status': 500, 'msg': failed[position]}
+            continue
+        inserted.append(document)
+        results[index] = {'index': index, 'status': 201, '_id': str(document["_id"])}
+        history.append({
+            "task_id": document["_id"],
+            "changed_by": "System",
+            "change_time": now,
+            "changes": collect_changes({}, item)
+        })
+    if history:
+        get_task_history_log().insert_many(history, ordered=False)
+        update_task_stats(added=inserted)
+        bump_tasks_version()
+        for document in inserted:
+            publish_task_event("created", document["_id"], [document["assigned_to"]], version=1)
+
+    return jsonify({
+        'inserted': len(history),
+        'failed': len(data) - len(history),
+        'results': results
+    }), 200
+
+#Bulk update tasks
+@tasks_bp.route("/bulkUpdate", methods=["PUT"])
+@token_required
+def bulk_update_tasks(user_id):
+    data, error = read_bulk_body()
+    if error:
+        return error
+
+    current_user = load_identity(user_id)
+    if not current_user:
+        return jsonify({'msg': "User not found"}), 404
+    current_user_name = current_user.get("name").lower()
+    user_role = current_user.get("role")
 
-    # Add the task with an initial history entry
-    Task_management.insert_one({
-        "title": title,
-        "description": description,
-        "status": status,
-        "assigned_to": assigned_to,
-        "due_date": due_date,
-        "priority": priority_numeric,  # Numeric value for sorting
-        "priority_label": priority_label,  # String label for display
-        "comments": [],  # Initialize comments as an empty list
-        "history": [  # Initialize history with a creation record
-            {
-                "changed_by": "System",  # or "Admin" if preferred
-                "change_time": datetime.utcnow(),
-                "changes": {
-                    "title": {
-                        "old_value": None,
-                        "new_value": title
-                    },
-                    "description": {
-                        "old_value": None,
-                        "new_value": description
-                    },
-                    "status": {
-                        "old_value": None,
-                        "new_value": status
-                    },
-                    "assigned_to": {
-                        "old_value": None,
-                        "new_value": assigned_to
-                    },
-                    "due_date": {
-                        "old_value": None,
-                        "new_value": due_date
-                    },
-                    "priority": {
-                        "old_value": None,
-                        "new_value": priority_label
-                    }
-                }
+    results = [None] * len(data)
+    valid = []
+    for index, item in enumerate(data):
+        results[index] = validate_bulk_item(index, item)
+        if results[index] is not None:
+            continue
+        # ObjectId(None) would make up a new id, so a missing _id must be caught first
+        if not isinstance(item.get("_id"), str):
+            results[index] = {'index': index, 'status': 400, 'msg': "Missing or invalid _id"}
+            continue
+        try:
+            valid.append((index, item, ObjectId(item["_id"])))
+        except Exception:
+            results[index] = {'index': index, 'status': 400, 'msg': "Invalid ID format"}
+
+    # Every item is diffed against the stored task, so a task updated twice in
+    # one request would get wrong history and statistics: reject all its items
+    occurrences = {}
+    for _, _, task_id in valid:
+        occurrences[task_id] = occurrences.get(task_id, 0) + 1
+    for index, _, task_id in valid:
+        if occurrences[task_id] > 1:
+            results[index] = {'index': index, 'status': 400, 'msg': "Duplicate _id in request"}
+    valid = [(index, item, task_id) for index, item, task_id in valid if occurrences[task_id] == 1]
+
+    # One query for all assignees and one for all current task values
+    known_assignees = resolve_assignees([item for _, item, _ in valid]) if valid else set()
+    task_ids = list({task_id for _, _, task_id in valid})
+    tasks = {
+        task["_id"]: task
+        for task in get_task_management().find({"_id": {"$in": task_ids}}, dict(TASK_DIFF_PROJECTION, version=1))
+    } if task_ids else {}
+
+    operations = []  # (index, task_id, changes)
+    for index, item, task_id in valid:
+        task = tasks.get(task_id)
+        if item["assigned_to"].lower() not in known_assignees:
+            results[index] = {'index': index, 'status': 404, 'msg': "Assigned user not found"}
+        elif not task:
+            results[index] = {'index': index, 'status': 404, 'msg': "Task not found"}
+        elif user_role != 'admin' and task["assigned_to"].lower() != current_user_name:
+            results[index] = {'index': index, 'status': 403, 'msg': "Not authorized to update this task"}
+        else:
+            operations.append((index, task_id, item, collect_changes(task, item)))
+
+    # Each update only applies to the version that was read, so the values read
+    # above are exactly the ones replaced. bulk_write only reports how many
+    # matched: when some did not, the write_id stamped on this request's updates
+    # tells which ones did, and the others are reported as conflicts
+    write_id = ObjectId()
+    failed = {}
+    conflicts = set()
+    if operations:
+        try:
+            result = get_task_management().bulk_write(
+                [UpdateOne(
+                    {"_id": task_id, "version": tasks[task_id].get("version") or {"$in": [0, None]}},
+                    {"$set": dict(task_fields(item), updated_at=datetime.utcnow(), write_id=write_id),
+                     "$inc": {"version": 1}}
+                ) for _, task_id, item, _ in operations],
+                ordered=False
+            )
+        except BulkWriteError as e:
+            failed = {error["index"]: error.get("errmsg", "Write failed") for error in e.details.get("writeErrors", [])}
+            matched = e.details.get("nMatched", 0)
+        else:
+            matched = result.matched_count
+        if matched < len(operations) - len(failed):
+            written = {
+                task["_id"]
+                for task in get_task_management().find(
+                    {"_id": {"$in": [task_id for _, task_id, _, _ in operations]}, "write_id": write_id}, {"_id": 1}
+                )
             }
-        ]
-    })
-    return jsonify({'msg': "Task Added Successfully"}), 201
+            conflicts = {
+                position for position, (_, task_id, _, _) in enumerate(operations)
+                if position not in failed and task_id not in written
+            }
+
+    now = datetime.utcnow()
+    history = []
+    updated = 0
+    previous, current = [], []
+    for position, (index, task_id, item, changes) in enumerate(operations):
+        if position in failed:
+            results[index] = {'index': index, 'status': 500, 'msg': failed[position]}
+            continue
+        if position in conflicts:
+            results[index] = {'index': index, 'status': 409,
+                              'msg': "The task was changed by someone else. Reload it and try again"}
+            continue
+        updated += 1
+        previous.append(tasks[task_id])
+        current.append(task_fields(item))
+        results[index] = {'index': index, 'status': 200, '_id': str(task_id)}
+        if changes:
+            history.append({
+                "task_id": task_id,
+                "changed_by": current_user.get("name", "Unknown"),
+                "change_time": now,
+                "changes": changes
+            })
+    if history:
+        get_task_history_log().insert_many(history, ordered=False)
+    if updated:
+        update_task_stats(removed=previous, added=current)
+        bump_tasks_version()
+        for position, (_, task_id, item, _) in enumerate(operations):
+            if position not in failed and position not in conflicts:
+                publish_task_event("updated", task_id, [tasks[task_id]["assigned_to"], item["assigned_to"]])
+
+    return jsonify({
+        'updated': updated,
+        'failed': len(data) - updated,
+        'results': results
+    }), 200
 
 #Delete task
 @tasks_bp.route("/deleteTask/<id>", methods=["DELETE"])
@@ -223,8 +596,16 @@ def delete_task(user_id, id):
     except Exception:
         return jsonify({'msg': "Invalid ID format"}), 400
 
-    result = Task_management.delete_one({"_id": task_id})
-    if result.deleted_count > 0:
+    # find_one_and_delete returns the fields the statistics counters need
+    task = Task_management.find_one_and_delete(
+        {"_id": task_id},
+        {"status": 1, "priority_label": 1, "assigned_to_lc": 1, "assigned_to": 1}
+    )
+    if task:
+        update_task_stats(removed=[task])
+        get_task_comments().delete_many({"task_id": task_id})
+        bump_tasks_version()
+        publish_task_event("deleted", task_id, [task.get("assigned_to")])
         return jsonify({'msg': "Task Deleted Successfully"}), 200
     else:
         return jsonify({'msg': "No task to delete"}), 404
@@ -236,137 +617,159 @@ def update_task(user_id, id):
     Task_management = get_task_management()
     User_management = get_user_management()
     data = request.get_json()
-    required_fields = ["title", "description", "status", "assigned_to", "due_date", "priority"]
-
-    # Check if all required fields are present
-    if not all(field in data for field in required_fields):
-        return jsonify({'msg': "Missing fields in request"}), 400
-
-    title = data["title"]
-    description = data["description"]
-    status = data["status"]
-    assigned_to_name = data["assigned_to"]
-    due_date = data["due_date"]
-    priority = data["priority"]
-
-    # Priority mapping from string to numeric for sorting
-    priority_mapping = {
-        'Low': 1,
-        'Medium': 2,
-        'High': 3
-    }
-    
-    # Convert priority to numeric and keep the label for display
-    priority_numeric = priority_mapping.get(priority, 1)  # Use None if not found
-    priority_label = priority  # Keep the string label for display
-
-    # Validate data
-    error_message, status_code = validate_task_data(title, description, status, assigned_to_name, due_date, priority_label)
+    error_message, status_code = validate_task_item(data)
     if error_message:
         return jsonify({'msg': error_message}), status_code
+    assigned_to_name = data["assigned_to"]
 
     try:
         task_id = ObjectId(id)
     except Exception:
         return jsonify({'msg': "Invalid ID format"}), 400
-    user_query = {"name": re.compile(f"^{re.escape(assigned_to_name)}$", re.IGNORECASE)}
-    assigned_user = User_management.find_one(user_query)
+    assigned_user = User_management.find_one({"name_lc": assigned_to_name.lower()})
     if not assigned_user:
         return jsonify({'msg': "Assigned user not found"}), 404
-    # Find the task to update
-    task = Task_management.find_one({"_id": task_id})
-    if not task:
-        return jsonify({'msg': "Task not found"}), 404
-
     # Find the current user
-    current_user = User_management.find_one({"_id": ObjectId(user_id)})
+    current_user = load_identity(user_id)
     if not current_user:
         return jsonify({'msg': "User not found"}), 404
 
     current_user_name = current_user.get("name").lower()
-    user_role = current_user.get("role")
+    is_admin = current_user.get("role") == 'admin'
+
+    # One round trip: non-admins can only update their own task, and the
+    # values being replaced come back for the history entry and statistics
+    query = {"_id": task_id}
+    if not is_admin:
+        query["assigned_to_lc"] = current_user_name
+    fields = task_fields(data)
+    task = Task_management.find_one_and_update(
+        query,
+        {"$set": dict(fields, updated_at=datetime.utcnow()), "$inc": {"version": 1}},
+        projection=TASK_DIFF_PROJECTION,
+        return_document=ReturnDocument.BEFORE
+    )
 
-    # Check if the user is authorized to update this task
-    if user_role != 'admin' and task["assigned_to"].lower() != current_user_name:
+    if task is None:
+        if not Task_management.find_one({"_id": task_id}, {"_id": 1}):
+            return jsonify({'msg': "Task not found"}), 404
         return jsonify({'msg': "Not authorized to update this task"}), 403
 
-    # Collect changes
-    changes = {}
-    if task.get("title") != title:
-        changes["title"] = {
-            "old_value": task.get("title"),
-            "new_value": title
-        }
-    if task.get("description") != description:
-        changes["description"] = {
-            "old_value": task.get("description"),
-            "new_value": description
-        }
-    if task.get("status") != status:
-        changes["status"] = {
-            "old_value": task.get("status"),
-            "new_value": status
-        }
-    if task.get("assigned_to") != assigned_to_name:
-        changes["assigned_to"] = {
-            "old_value": task.get("assigned_to"),
-            "new_value": assigned_to_name
-        }
-    if task.get("due_date") != due_date:
-        changes["due_date"] = {
-            "old_value": task.get("due_date"),
-            "new_value": due_date
-        }
-    if task.get("priority_label") != priority_label:
-        changes["priority"] = {
-            "old_value": task.get("priority_label"),
-            "new_value": priority_label
-        }
-
-            # Create the update operations
-    update_operations = {
-        "$set": {
-            "title": title,
-            "description": description,
-            "status": status,
-            "assigned_to": assigned_to_name,
-            "due_date": due_date,
-            "priority": priority_numeric,  # Numeric priority for sorting
-            "priority_label": priority_label  # String priority label for display
-        }
-    }
-
-    # Conditionally add the $push operation if there are changes
+    # Record the changes in the audit log
+    changes = collect_changes(task, data)
     if changes:
-        update_operations['$push'] = {
-            'history': {
-                "changed_by": current_user.get("name", "Unknown"),
-                "change_time": datetime.utcnow(),
-                "changes": changes
-            }
-        }
+        get_task_history_log().insert_one({
+            "task_id": task_id,
+            "changed_by": current_user.get("name", "Unknown"),
+            "change_time": datetime.utcnow(),
+            "changes": changes
+        })
 
-# Perform the update operation
-    result = Task_management.update_one(
-        {"_id": task_id},
-        update_operations
+    update_task_stats(removed=[task], added=[fields])
+    bump_tasks_version()
+    publish_task_event("updated", task_id, [task.get("assigned_to"), assigned_to_name])
+    return jsonify({'msg': "Task Details Updated Successfully"}), 200
+
+# Stored fields for the subset of validated request values in a partial update
+def patch_fields(values):
+    fields = {}
+    for field in ("title", "description", "status", "due_date"):
+        if field in values:
+            fields[field] = values[field]
+    if "assigned_to" in values:
+        fields["assigned_to"] = values["assigned_to"]
+        fields["assigned_to_lc"] = values["assigned_to"].lower()  # Normalized for indexed lookups
+    if "priority" in values:
+        fields["priority"] = PRIORITY_MAPPING[values["priority"]]  # Numeric value for sorting
+        fields["priority_label"] = values["priority"]  # String label for display
+    return fields
+
+#Partial task update, guarded by the task version (optimistic concurrency)
+@tasks_bp.route("/updateTask/<id>", methods=["PATCH"])
+@token_required
+def patch_task(user_id, id):
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({'msg': "Request body must be a JSON object"}), 400
+
+    version = data.get("version")
+    if not isinstance(version, int) or isinstance(version, bool):
+        return jsonify({'msg': "The task version being edited is required"}), 400
+    values = {field: value for field, value in data.items() if field != "version"}
+    unknown = set(values) - set(TASK_FIELDS)
+    if unknown:
+        return jsonify({'msg': f"Unknown fields: {', '.join(sorted(unknown))}"}), 400
+    if not values:
+        return jsonify({'msg': "No fields to update"}), 400
+
+    error_message, status_code = validate_task_patch(values)
+    if error_message:
+        return jsonify({'msg': error_message}), status_code
+
+    try:
+        task_id = ObjectId(id)
+    except Exception:
+        return jsonify({'msg': "Invalid ID format"}), 400
+
+    current_user = load_identity(user_id)
+    if not current_user:
+        return jsonify({'msg': "User not found"}), 404
+    current_user_name = current_user.get("name").lower()
+    is_admin = current_user.get("role") == 'admin'
+
+    if "assigned_to" in values and not get_user_management().find_one({"name_lc": values["assigned_to"].lower()}, {"_id": 1}):
+        return jsonify({'msg': "Assigned user not found"}), 404
+
+    # One round trip: the write only applies to the version the client edited
+    # (and, for non-admins, to their own task); the previous values of the
+    # changed fields come back for the history entry and statistics
+    # Tasks written before versioning have no version field and are served as version 0
+    query = {"_id": task_id, "version": version if version else {"$in": [0, None]}}
+    if not is_admin:
+        query["assigned_to_lc"] = current_user_name
+    fields = patch_fields(values)
+    projection = dict(PATCH_BASE_PROJECTION, **{HISTORY_FIELDS[field]: 1 for field in values})
+    previous = get_task_management().find_one_and_update(
+        query,
+        {"$set": dict(fields, updated_at=datetime.utcnow()), "$inc": {"version": 1}},
+        projection=projection,
+        return_document=ReturnDocument.BEFORE
     )
 
-    if result.matched_count > 0:
-        return jsonify({'msg': "Task Details Updated Successfully"}), 200
-    else:
-        return jsonify({'msg': "Task does not exist"}), 404
+    if previous is None:
+        task = get_task_management().find_one({"_id": task_id}, {"assigned_to_lc": 1, "version": 1})
+        if not task:
+            return jsonify({'msg': "Task not found"}), 404
+        if not is_admin and task.get("assigned_to_lc") != current_user_name:
+            return jsonify({'msg': "Not authorized to update this task"}), 403
+        return jsonify({
+            'msg': "The task was changed by someone else. Reload it and try again",
+            'version': task.get("version", 0)
+        }), 409
+
+    changes = collect_changes(previous, values)
+    if changes:
+        get_task_history_log().insert_one({
+            "task_id": task_id,
+            "changed_by": current_user.get("name", "Unknown"),
+            "change_time": datetime.utcnow(),
+            "changes": changes
+        })
+    update_task_stats(removed=[previous], added=[dict(previous, **fields)])
+    bump_tasks_version()
+    publish_task_event("updated", task_id, [previous.get("assigned_to"), fields.get("assigned_to")], version=version + 1)
+
+    return jsonify({'msg': "Task Details Updated Successfully", 'version': version + 1}), 200
 
 #Add comments
 @tasks_bp.route("/addComment/<task_id>", methods=["POST"])
 @token_required
 def add_comment(user_id, task_id):
     Task_management = get_task_management()
-    User_management = get_user_management()
     data = request.get_json()
-    text = data.get("text")
+    text = data.get("text") if isinstance(data, dict) else None
 
-    if not text:
+    if not isinstance(text, str) or not text.strip():
         return jsonify({'msg': "Comment text is required"}), 400
 
     try:
@@ -374,27 +777,55 @@ def add_comment(user_id, task_id):
     except Exception:
         return jsonify({'msg': "Invalid Task ID format"}), 400
 
-    user = User_management.find_one({"_id": ObjectId(user_id)})
+    user = load_identity(user_id)
     if not user:
         return jsonify({'msg': 'User not found'}), 404
 
     author_name = user.get("name", "Unknown")  # Get the author's name
+    created_at = datetime.utcnow()
 
-    Task_management.update_one(
+    if not Task_management.find_one({"_id": task_id}, {"_id": 1}):
+        return jsonify({'msg': "Task not found"}), 404
+
+    # The comment goes to Task_comments so the task document stays small. It is
+    # written before the task's version moves, so a reader that sees the new
+    # version (and ETag) also sees the comment
+    comment_id = get_task_comments().insert_one({
+        "task_id": task_id,
+        "text": text,
+        "user": ObjectId(user_id),
+        "author": author_name,  # Add author's name to the comment
+        "createdAt": created_at
+    }).inserted_id
+
+    # Keep only a counter and a short preview on the task
+    task = Task_management.find_one_and_update(
         {"_id": task_id},
-        {'$push': {
-            "comments": {
-                "text": text,
-                "user": ObjectId(user_id),
-                "author": author_name,  # Add author's name to the comment
-                "createdAt": datetime.utcnow()
+        {
+            '$inc': {"comment_count": 1, "version": 1},
+            '$set': {
+                "latest_comment": {
+                    "text": text[:COMMENT_PREVIEW_LENGTH],
+                    "author": author_name,
+                    "createdAt": created_at
+                },
+                "updated_at": created_at
             }
-        }}
+        },
+        projection={"assigned_to": 1, "version": 1},
+        return_document=ReturnDocument.AFTER
     )
+    if not task:
+        # Deleted in between: don't leave the comment behind
+        get_task_comments().delete_one({"_id": comment_id})
+        return jsonify({'msg': "Task not found"}), 404
+
+    bump_tasks_version()
+    publish_task_event("commented", task_id, [task.get("assigned_to")], version=task.get("version"))
 
     return jsonify({'msg': "Comment Added Successfully"}), 201
 
-#Get comments
+#Get comments (newest first, keyset pagination on createdAt, _id)
 @tasks_bp.route("/getComments/<task_id>", methods=["GET"])
 @token_required
 def get_comments(user_id, task_id):
@@ -405,29 +836,67 @@ def get_comments(user_id, task_id):
     except Exception:
         return jsonify({'msg': "Invalid Task ID format"}), 400
 
-    task = Task_management.find_one({"_id": task_id})
+    limit = parse_limit(request.args.get("limit"))
+    if limit is None:
+        return jsonify({'msg': "Invalid limit"}), 400
+
+    # The task's version changes with every comment, so it is enough for the ETag
+    task = Task_management.find_one({"_id": task_id}, {"version": 1})
     if not task:
         return jsonify({'msg': "Task not found"}), 404
 
-    comments = task.get("comments", [])
-    
-    # Convert ObjectId to string for serialization
-    for comment in comments:
-        comment['user'] = str(comment.get('user'))  # Ensure 'user' field is a string
-        comment['createdAt'] = comment.get('createdAt', datetime.utcnow()).isoformat()  # Format datetime
+    etag = make_etag(task_id, task.get("version", 0), request.full_path)
+    cached = not_modified(etag)
+    if cached:
+        return cached
+
+    query = {"task_id": task_id}
+    cursor_token = request.args.get("cursor")
+    if cursor_token:
+        cursor = decode_cursor(cursor_token)
+        page_filter = keyset_filter(cursor, "createdAt") if cursor else None
+        if page_filter is None:
+            return jsonify({'msg': "Invalid cursor"}), 400
+        query.update(page_filter)
 
-    return jsonify(comments), 200
+    docs = list(get_task_comments().find(query).sort([("createdAt", -1), ("_id", -1)]).limit(limit + 1))
 
+    next_cursor = None
+    if len(docs) > limit:
+        docs = docs[:limit]
+        next_cursor = next_keyset_cursor(docs[-1], "createdAt")
+
+    return with_etag(jsonify({'comments': docs, 'next_cursor': next_cursor}), etag), 200
+
+#Get task history (newest first, paged with limit/before)
 @tasks_bp.route("/getTaskHistory/<string:task_id>", methods=["GET"])
 @token_required
 def get_task_history(user_id, task_id):
     try:
-        Task_management = get_task_management()
+        limit = parse_limit(request.args.get("limit"))
+        if limit is None:
+            return jsonify({'msg': "Invalid limit"}), 400
 
-        task = Task_management.find_one({"_id": ObjectId(task_id)}, {"history": 1})
-        if not task:
+        task_id = ObjectId(task_id)
+        if not get_task_management().find_one({"_id": task_id}, {"_id": 1}):
             return jsonify({'msg': 'Task not found'}), 404
 
-        return jsonify({"history": task.get("history", [])}), 200
+        query = {"task_id": task_id}
+        before = request.args.get("before")
+        if before:
+            cursor = decode_cursor(before)
+            page_filter = keyset_filter(cursor, "change_time") if cursor else None
+            if page_filter is None:
+                return jsonify({'msg': "Invalid before cursor"}), 400
+            query.update(page_filter)
+
+        docs = list(get_task_history_log().find(query).sort([("change_time", -1), ("_id", -1)]).limit(limit + 1))
+
+        next_before = None
+        if len(docs) > limit:
+            docs = docs[:limit]
+            next_before = next_keyset_cursor(docs[-1], "change_time")
+
+        return jsonify({"history": docs, "next_before": next_before}), 200
     except Exception as e:
         return jsonify({'msg': f"An error occurred: {str(e)}"}), 500
@@ -1,12 +1,30 @@
-from flask import Blueprint, jsonify, request, current_app
+import json
+from flask import Blueprint, Response, jsonify, request, current_app, stream_with_context
 from bson import ObjectId
-from utils.hashing import hash_password
+from pymongo.errors import BulkWriteError
+from utils.hashing import hash_password, hash_passwords
 from utils.validate.helpers import email_exists, get_user_id, validate_user_data
 from utils.jwt_manager import token_required
 from utils.role_decorator import role_required
+from utils.user_loader import invalidate_user
+from utils.pagination import parse_limit
+from utils.streaming import chunked, export_response, iter_csv_rows, iter_ndjson_rows
+from utils.projection import fields_projection, parse_fields
 
 users_bp = Blueprint('users', __name__)
 
+IMPORT_CHUNK_SIZE = 500
+# Fields the user listing endpoints can return (`fields=`); never the password hash
+USER_FIELDS = ["_id", "name", "email", "role"]
+EXPORT_BATCH_SIZE = 1000
+MAX_EXPORT_BATCH_SIZE = 10000
+EXPORT_FIELDS = USER_FIELDS
+IMPORT_FORMATS = {
+    'text/csv': 'csv',
+    'application/x-ndjson': 'ndjson',
+    'application/ndjson': 'ndjson'
+}
+
 # Helper function to get User_management collection
 def get_user_management():
     return current_app.config['MONGO_DB'].User_management
@@ -14,21 +32,30 @@ def get_user_management():
 def error_response(message, status_code):
     return jsonify({'error': message}), status_code
 
+# API representation of a user, limited to `fields` when given; the ObjectId is
+# encoded by the JSON provider
+def format_user(user, fields=None):
+    formatted = {
+        "_id": user.get("_id"),
+        "name": user.get("name"),
+        "email": user.get("email"),
+        "role": user.get("role", "user")  # Default role to 'user' if not present
+    }
+    if fields is None:
+        return formatted
+    return {field: formatted[field] for field in fields}
+
 # Get all users
 @users_bp.route("/getUser/", methods=["GET"])
 @token_required
 @role_required(['admin'])
 def get_all_users(user_id):
     User_management = get_user_management()
-    users = []
-    
-    for user in User_management.find():  # Retrieve all users
-        users.append({
-            "_id": str(user["_id"]),
-            "name": user.get("name"),
-            "email": user.get("email"),
-            "role": user.get("role")  # Default role to 'user' if not present
-        })
+    fields = parse_fields(request.args.get("fields"), USER_FIELDS, USER_FIELDS)
+    if fields is None:
+        return jsonify({'msg': f"Invalid fields. Allowed: {', '.join(USER_FIELDS)}"}), 400
+    # Retrieve all users, only the requested fields
+    users = [format_user(user, fields) for user in User_management.find({}, fields_projection(fields))]
         
     if users:
         return jsonify(users), 200
@@ -41,17 +68,13 @@ def get_all_users(user_id):
 @role_required(['admin'])
 def get_user(user_id, name):
     User_management = get_user_management()
+    fields = parse_fields(request.args.get("fields"), USER_FIELDS, USER_FIELDS)
+    if fields is None:
+        return jsonify({'msg': f"Invalid fields. Allowed: {', '.join(USER_FIELDS)}"}), 400
     try:
         # Find users by name using a case-insensitive regex search
-        users_cursor = User_management.find({"name": {"$regex": name, "$options": "i"}})
-        users_list = []
-        for user in users_cursor:
-            users_list.append({
-                "_id": str(user["_id"]),
-                "name": user.get("name"),
-                "email": user.get("email"),
-                "role": user.get("role", "user")  # Default role to 'user' if not present
-            })
+        users_cursor = User_management.find({"name": {"$regex": name, "$options": "i"}}, fields_projection(fields))
+        users_list = [format_user(user, fields) for user in users_cursor]
         
         if users_list:
             return jsonify(users_list), 200
@@ -99,6 +122,7 @@ def add_user(user_id):
     User_management = get_user_management()
     User_management.insert_one({
         "name": name,
+        "name_lc": name.lower(),
         "email": email,
         "password": hashed_password,
         "role": role  # Include the role in the new user document
@@ -118,6 +142,7 @@ def delete_user(user_id, id):
         return jsonify({'msg': "Invalid ID format"}), 400
     
     result = User_management.delete_one({"_id": user_id})
+    invalidate_user(user_id)
     if result.deleted_count > 0:
         return jsonify({'msg': "User Deleted Successfully"}), 200
     else:
@@ -159,6 +184,7 @@ def update_user(user_id, id):
 
     updates = {
         "name": name,
+        "name_lc": name.lower(),
         "email": email,
     }
 
@@ -174,9 +200,141 @@ def update_user(user_id, id):
     User_management = get_user_management()
     result = User_management.update_one(
         {"_id": user_id},
-        {'$set': updates}
+        {'$set': updates, '$inc': {"token_version": 1}}  # Revoke tokens carrying the old claims
     )
+    invalidate_user(user_id)
     if result.matched_count > 0:
         return jsonify({'msg': "User Details Updated Successfully"}), 200
     else:
         return jsonify({'msg': "User Does not exist"}), 404
+
+# Export users as NDJSON or CSV, streamed straight from the cursor
+@users_bp.route("/export", methods=["GET"])
+@token_required
+@role_required(['admin'])
+def export_users(user_id):
+    file_format = request.args.get("format", "ndjson")
+    if file_format not in ("ndjson", "csv"):
+        return jsonify({'msg': "Unsupported format. Use ndjson or csv"}), 400
+
+    fields = parse_fields(request.args.get("fields"), EXPORT_FIELDS, EXPORT_FIELDS)
+    if fields is None:
+        return jsonify({'msg': f"Invalid fields. Allowed: {', '.join(EXPORT_FIELDS)}"}), 400
+
+    batch_size = parse_limit(request.args.get("batch_size"), default=EXPORT_BATCH_SIZE, maximum=MAX_EXPORT_BATCH_SIZE)
+    if batch_size is None:
+        return jsonify({'msg': "Invalid batch_size"}), 400
+
+    cursor = get_user_management().find({}, fields_projection(fields)).sort("_id", 1).batch_size(batch_size)
+
+    return export_response(cursor, fields, file_format, "users")
+
+# Import users from a CSV or NDJSON upload (raw body or multipart "file" field).
+# Rows are read, checked and inserted chunk by chunk and a per-row NDJSON report
+# is streamed back, so memory use does not depend on the file size.
+@users_bp.route("/import", methods=["POST"])
+@token_required
+@role_required(['admin'])
+def import_users(user_id):
+    file_format = request.args.get("format")
+    if request.mimetype == 'multipart/form-data':
+        upload = request.files.get("file")
+        if not upload:
+            return jsonify({'msg': "Missing file in request"}), 400
+        stream = upload.stream
+        if not file_format and upload.filename:
+            file_format = 'csv' if upload.filename.lower().endswith('.csv') else 'ndjson'
+    else:
+        stream = request.stream
+        file_format = file_format or IMPORT_FORMATS.get(request.mimetype)
+
+    if file_format not in ('csv', 'ndjson'):
+        return jsonify({'msg': "Unsupported format. Use csv or ndjson"}), 400
+
+    rows = iter_csv_rows(stream) if file_format == 'csv' else iter_ndjson_rows(stream)
+
+    def generate():
+        created = failed = 0
+        for chunk in chunked(rows, IMPORT_CHUNK_SIZE):
+            for result in import_user_chunk(chunk):
+                if result['status'] == 201:
+                    created += 1
+                else:
+                    failed += 1
+                yield json.dumps(result) + '\n'
+        yield json.dumps({'summary': {'created': created, 'failed': failed}}) + '\n'
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+def import_user_chunk(chunk):
+    """Validate, de-duplicate, hash and insert one chunk of (row_number, row) pairs."""
+    results = {}
+    candidates = []
+    seen_emails = set()
+    for row_number, row in chunk:
+        if row is None:
+            results[row_number] = {'row': row_number, 'status': 400, 'msg': "Malformed row"}
+            continue
+        if not all(isinstance(row.get(field), str) and row.get(field) for field in ["name", "email", "password"]):
+            results[row_number] = {'row': row_number, 'status': 400, 'msg': "Missing fields in row"}
+            continue
+
+        name = row["name"].strip()
+        email = row["email"].strip().lower()
+        role = row.get("role") or "user"
+        if role not in ["user", "admin"]:
+            results[row_number] = {'row': row_number, 'status': 400, 'msg': "Invalid role. Must be 'user' or 'admin'"}
+            continue
+
+        error_msg, status_code = validate_user_data(name, email, row["password"])
+        if error_msg:
+            results[row_number] = {'row': row_number, 'status': status_code, 'msg': error_msg}
+            continue
+        if email in seen_emails:
+            results[row_number] = {'row': row_number, 'status': 409, 'msg': 'Email already exists'}
+            continue
+        seen_emails.add(email)
+        candidates.append((row_number, name, email, row["password"], role))
+
+    # One indexed query for the whole chunk instead of email_exists per row
+    User_management = get_user_management()
+    existing = {
+        user["email"]
+        for user in User_management.find({"email": {"$in": list(seen_emails)}}, {"email": 1})
+    } if seen_emails else set()
+
+    new_users = []
+    for candidate in candidates:
+        row_number, email = candidate[0], candidate[2]
+        if email in existing:
+            results[row_number] = {'row': row_number, 'status': 409, 'msg': 'Email already exists'}
+        else:
+            new_users.append(candidate)
+
+    if new_users:
+        hashes = hash_passwords([password for _, _, _, password, _ in new_users])
+        documents = [{
+            "name": name,
+            "name_lc": name.lower(),
+            "email": email,
+            "password": hashed_password,
+            "role": role
+        } for (_, name, email, _, role), hashed_password in zip(new_users, hashes)]
+
+        failed = {}
+        try:
+            User_management.insert_many(documents, ordered=False)
+        except BulkWriteError as e:
+            failed = {error["index"]: error for error in e.details.get("writeErrors", [])}
+
+        for position, (row_number, _, email, _, _) in enumerate(new_users):
+            error = failed.get(position)
+            if error is None:
+                results[row_number] = {'row': row_number, 'status': 201, 'email': email, '_id': str(documents[position]["_id"])}
+            elif error.get("code") == 11000:
+                # Inserted concurrently by another import or registration
+                results[row_number] = {'row': row_number, 'status': 409, 'msg': 'Email already exists'}
+            else:
+                results[row_number] = {'row': row_number, 'status': 500, 'msg': error.get("errmsg", "Write failed")}
+
+    return [results[row_number] for row_number, _ in chunk]
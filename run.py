@@ -1,7 +1,41 @@
 # run.py
+import os
+from dotenv import load_dotenv
+
+# SERVER_MODE=production serves the app with gunicorn worker processes (see
+# utils/server.py); the default is Flask's development server
+load_dotenv()
+SERVER_MODE = os.getenv('SERVER_MODE', 'dev')
+
+# gevent workers need the standard library patched before the app creates its
+# locks, queues and sockets in the master, which the workers inherit
+if SERVER_MODE == 'production' and os.getenv('WEB_WORKER_CLASS') == 'gevent' and __name__ != '__mp_main__':
+    from gevent import monkey
+    monkey.patch_all()
+
 from app import create_app
 
-app = create_app()
+# The password hashing pool starts its processes with 'spawn', which re-imports
+# this script as __mp_main__; those processes only hash and don't need the app
+if __name__ != '__mp_main__':
+    if SERVER_MODE == 'production':
+        from utils.server import ProductionServer, default_event_streams, default_hash_workers, server_options
+        options = server_options()
+        os.environ.setdefault('HASH_WORKERS', str(default_hash_workers(options['workers'])))
+        os.environ.setdefault('EVENT_MAX_STREAMS', str(default_event_streams(options)))
+        # Locally published events only reach streams served by the worker that
+        # handled the write, so several workers need the change stream source
+        if options['workers'] > 1:
+            os.environ.setdefault('EVENT_SOURCE', 'changestream')
+            if os.environ['EVENT_SOURCE'] == 'local':
+                raise SystemExit(
+                    "EVENT_SOURCE=local only reaches streams on the worker that handled the write; "
+                    "use EVENT_SOURCE=changestream (needs a replica set) or WEB_WORKERS=1"
+                )
+    app = create_app()
 
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=8000,debug=True)
\ No newline at end of file
+    if SERVER_MODE == 'production':
+        ProductionServer(app, options).run()
+    else:
+        app.run(host=os.getenv('HOST', '0.0.0.0'), port=int(os.getenv('PORT', 8000)), debug=True)
@@ -0,0 +1,33 @@
+import hashlib
+from flask import current_app, request
+
+# Conditional GET support. Task documents carry a `version` that is incremented
+# on every write, and the Counters collection holds a collection-wide version
+# for the task list, bumped after each task write (so a reader can never pair
+# an old version with data it has not seen yet).
+
+def get_counters():
+    return current_app.config['MONGO_DB'].Counters
+
+def bump_tasks_version():
+    get_counters().update_one({"_id": "tasks"}, {"$inc": {"version": 1}}, upsert=True)
+
+def tasks_version():
+    doc = get_counters().find_one({"_id": "tasks"})
+    return doc.get("version", 0) if doc else 0
+
+def make_etag(*parts):
+    return hashlib.sha1(':'.join(str(part) for part in parts).encode('utf-8')).hexdigest()
+
+def not_modified(etag):
+    """Return a 304 response if the client already has `etag`, else None."""
+    if request.if_none_match.contains(etag):
+        response = current_app.response_class(status=304)
+        response.set_etag(etag)
+        return response
+    return None
+
+def with_etag(response, etag):
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'  # Always revalidate with If-None-Match
+    return response
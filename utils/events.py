@@ -0,0 +1,171 @@
+import os
+import queue
+import threading
+from flask import current_app
+
+# In-process pub/sub for task change events, consumed by the /tasks/stream SSE
+# endpoint. Events go to admins and to the users the task is assigned to.
+#
+# Each subscriber has a bounded queue. A subscriber that falls behind is marked
+# as overflowed instead of blocking publishers; its stream then tells the client
+# to resync and closes.
+#
+# Every open stream holds a request thread (or a greenlet under gevent workers)
+# for as long as the client stays connected, so the bus admits at most
+# EVENT_MAX_STREAMS subscribers per process and the route answers 503 beyond
+# that, leaving room for regular requests.
+#
+# EVENT_SOURCE=local         the task routes publish their own writes (default
+#                            with a single process)
+# EVENT_SOURCE=changestream  events come from a Mongo change stream on
+#                            Task_management, so every worker sees every write
+#                            (requires a replica set; run.py's default with
+#                            several production workers)
+
+class Subscription:
+    __slots__ = ('user_name', 'is_admin', 'queue', 'overflowed')
+
+    def __init__(self, user_name, is_admin, maxsize):
+        self.user_name = user_name
+        self.is_admin = is_admin
+        self.queue = queue.Queue(maxsize)
+        self.overflowed = False
+
+    def deliver(self, event):
+        if self.overflowed:
+            return
+        try:
+            self.queue.put_nowait(event)
+        except queue.Full:
+            self.overflowed = True
+
+    def get(self, timeout):
+        """Next event, or None if nothing arrived within `timeout` seconds."""
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+class EventBus:
+    def __init__(self, queue_size=100, max_subscribers=None):
+        self.queue_size = queue_size
+        self.max_subscribers = max_subscribers
+        self._by_user = {}
+        self._admins = set()
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def subscribe(self, user_name, is_admin=False):
+        """New subscription, or None when the bus already has max_subscribers."""
+        subscription = Subscription(user_name, is_admin, self.queue_size)
+        with self._lock:
+            if self.max_subscribers is not None and self._count >= self.max_subscribers:
+                return None
+            if is_admin:
+                self._admins.add(subscription)
+            else:
+                self._by_user.setdefault(user_name, set()).add(subscription)
+            self._count += 1
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            if subscription.is_admin:
+                subscribers = self._admins
+            else:
+                subscribers = self._by_user.get(subscription.user_name, set())
+            if subscription not in subscribers:
+                return  # Already unsubscribed
+            subscribers.discard(subscription)
+            self._count -= 1
+            if not subscription.is_admin and not subscribers:
+                del self._by_user[subscription.user_name]
+
+    def subscriber_count(self):
+        with self._lock:
+            return self._count
+
+    def publish(self, event, assignees=()):
+        """Deliver `event` to admins and to subscribers whose lower-cased name is in `assignees`."""
+        with self._lock:
+            targets = set(self._admins)
+            for name in assignees:
+                targets.update(self._by_user.get(name, ()))
+        for subscription in targets:
+            subscription.deliver(event)
+
+def init_event_bus(app):
+    app.extensions['event_bus'] = EventBus(
+        int(app.config.get('EVENT_QUEUE_SIZE', 100)),
+        app.config.get('EVENT_MAX_STREAMS')
+    )
+    # Pre-forking servers start the change stream in each worker after the fork
+    if app.config.get('SERVER_MODE') != 'production':
+        start_event_source(app)
+
+def start_event_source(app):
+    """Start this process's change stream reader when EVENT_SOURCE=changestream."""
+    if app.config.get('EVENT_SOURCE', 'local') != 'changestream':
+        return
+    source = app.extensions.get('event_source')
+    if source is None or source.pid != os.getpid() or not source.is_alive():
+        source = ChangeStreamSource(app)
+        source.start()
+        app.extensions['event_source'] = source
+
+def get_event_bus():
+    return current_app.extensions['event_bus']
+
+def publish_task_event(event_type, task_id, assignees, version=None):
+    """Publish a task change from a route. No-op when events come from the change stream."""
+    if current_app.config.get('EVENT_SOURCE', 'local') != 'local':
+        return
+    event = {"type": event_type, "task_id": task_id}
+    if version is not None:
+        event["version"] = version
+    get_event_bus().publish(event, [name.lower() for name in assignees if name])
+
+class ChangeStreamSource(threading.Thread):
+    """Feeds the event bus from a change stream on Task_management."""
+
+    def __init__(self, app):
+        super().__init__(name='task-change-stream', daemon=True)
+        self.app = app
+        self.pid = os.getpid()
+
+    def run(self):
+        bus = self.app.extensions['event_bus']
+        collection = self.app.config['MONGO_DB'].Task_management
+        resume_token = None
+        while True:
+            try:
+                with collection.watch(full_document='updateLookup', resume_after=resume_token) as stream:
+                    for change in stream:
+                        resume_token = stream.resume_token
+                        event = self.to_event(change)
+                        if event:
+                            bus.publish(*event)
+            except Exception as e:
+                self.app.logger.warning(f"Task change stream interrupted: {e}")
+                threading.Event().wait(5)
+
+    @staticmethod
+    def to_event(change):
+        operation = change["operationType"]
+        task_id = change["documentKey"]["_id"]
+        task = change.get("fullDocument") or {}
+        assignees = [task["assigned_to_lc"]] if task.get("assigned_to_lc") else []
+        if operation == "insert":
+            event_type = "created"
+        elif operation in ("update", "replace"):
+            updated = change.get("updateDescription", {}).get("updatedFields", {})
+            event_type = "commented" if "comment_count" in updated else "updated"
+        elif operation == "delete":
+            # The deleted document is gone, so only admins can be notified
+            event_type = "deleted"
+        else:
+            return None
+        event = {"type": event_type, "task_id": task_id}
+        if task.get("version") is not None:
+            event["version"] = task["version"]
+        return event, assignees
@@ -1,7 +1,124 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from werkzeug.security import generate_password_hash, check_password_hash
+from utils.metrics import PASSWORD_HASHES, PASSWORD_HASHES_REJECTED
+
+# Password hashing is deliberately slow, so it runs in a dedicated process pool
+# instead of on the request thread. The number of in-flight hashes is bounded;
+# when the pool is saturated callers get HashingBusy (served as a 503) right away
+# instead of queueing behind a login burst. If a pool process dies (e.g. it is
+# OOM-killed) the pool is broken for good, so it is replaced and the hash retried.
+#
+# HASH_WORKERS     pool processes (default: CPU count, 0 hashes inline)
+# HASH_QUEUE_SIZE  max hashes queued or running per web process (default: 4 per worker)
+
+class HashingBusy(Exception):
+    """Raised when the hashing pool has no free slot."""
+
+_lock = threading.Lock()
+_executor = None
+_executor_pid = None
+_slots = None
+
+def _hash_workers():
+    return int(os.getenv('HASH_WORKERS', os.cpu_count() or 1))
+
+def _get_executor():
+    global _executor, _executor_pid, _slots
+    if _executor is not None and _executor_pid == os.getpid():
+        return _executor
+    with _lock:
+        workers = _hash_workers()
+        if _executor_pid != os.getpid():
+            # A pool inherited through fork() belongs to the parent; build a new one
+            queue_size = int(os.getenv('HASH_QUEUE_SIZE', max(workers, 1) * 4))
+            _executor = None
+            _executor_pid = os.getpid()
+            _slots = threading.BoundedSemaphore(queue_size)
+        if _executor is None:
+            _executor = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context('spawn')
+            )
+    return _executor
+
+def _replace_broken_executor(executor):
+    """Drop a pool that lost a process; the next _get_executor() builds a new one."""
+    global _executor
+    with _lock:
+        if _executor is executor:
+            executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
+
+def _run(fn, *args):
+    if _hash_workers() == 0:
+        return fn(*args)
+    executor = _get_executor()
+    slots = _slots
+    if not slots.acquire(blocking=False):
+        PASSWORD_HASHES_REJECTED.inc()
+        raise HashingBusy()
+    try:
+        try:
+            return executor.submit(fn, *args).result()
+        except BrokenProcessPool:
+            _replace_broken_executor(executor)
+            return _get_executor().submit(fn, *args).result()
+    finally:
+        slots.release()
+
+def hash_passwords(passwords):
+    """Hash many passwords in parallel (bulk imports).
+
+    Keeps at most one job per pool worker in flight and waits for free slots
+    instead of failing, so concurrent logins still find capacity.
+    """
+    workers = _hash_workers()
+    PASSWORD_HASHES.inc('hash', amount=len(passwords))
+    if workers == 0:
+        return [generate_password_hash(password) for password in passwords]
+    executor = _get_executor()
+    slots = _slots
+    window = threading.BoundedSemaphore(workers)
+
+    def release(_future=None):
+        slots.release()
+        window.release()
+
+    futures = []
+    try:
+        for password in passwords:
+            window.acquire()
+            slots.acquire()
+            try:
+                future = executor.submit(generate_password_hash, password)
+            except BaseException:
+                release()
+                raise
+            future.add_done_callback(release)
+            futures.append(future)
+        return [future.result() for future in futures]
+    except BrokenProcessPool:
+        _replace_broken_executor(executor)
+        raise
+
+def shutdown_hashing_pool():
+    global _executor, _executor_pid
+    with _lock:
+        if _executor is not None and _executor_pid == os.getpid():
+            _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+        _executor_pid = None
 
 def hash_password(password: str) -> str:
-    return generate_password_hash(password)
+    hashed = _run(generate_password_hash, password)
+    PASSWORD_HASHES.inc('hash')
+    return hashed
 
 def verify_password(password: str, hashed_password: str) -> bool:
-    return check_password_hash(hashed_password, password)
+    matches = _run(check_password_hash, hashed_password, password)
+    PASSWORD_HASHES.inc('verify')
+    return matches
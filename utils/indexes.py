@@ -0,0 +1,61 @@
+from pymongo import ASCENDING, DESCENDING, TEXT
+from pymongo.errors import OperationFailure
+
+def ensure_indexes(db):
+    """Create the indexes the routes rely on. create_index is a no-op when the index already exists.
+
+    An index the data doesn't allow (e.g. duplicate emails under the unique
+    index) doesn't stop the others from being built; the failures are
+    returned as (collection, keys, error) for the caller to report.
+    Connection errors are raised.
+    """
+    failures = []
+
+    def create_index(collection, keys, **options):
+        try:
+            collection.create_index(keys, **options)
+        except OperationFailure as e:
+            failures.append((collection.name, keys, e))
+
+    # Task listing: admins page over (priority, _id), users over their own tasks
+    create_index(db.Task_management, [("priority", DESCENDING), ("_id", DESCENDING)])
+    create_index(db.Task_management,
+        [("assigned_to_lc", ASCENDING), ("priority", DESCENDING), ("_id", DESCENDING)]
+    )
+
+    # Overdue count for /tasks/stats
+    create_index(db.Task_management, [("status", ASCENDING), ("due_date", ASCENDING)])
+
+    # Ranked search over title and description; title matches weigh more
+    create_index(db.Task_management,
+        [("title", TEXT), ("description", TEXT)],
+        weights={"title": 10, "description": 1},
+        name="task_text_search"
+    )
+
+    # Comments live in their own collection and are paged per task, newest first
+    create_index(db.Task_comments,
+        [("task_id", ASCENDING), ("createdAt", DESCENDING), ("_id", DESCENDING)]
+    )
+
+    # Append-only audit log of task changes, paged per task, newest first
+    create_index(db.Task_history,
+        [("task_id", ASCENDING), ("change_time", DESCENDING), ("_id", DESCENDING)]
+    )
+
+    # Mail outbox: the worker claims due mail by status; delivered mail expires after a week
+    create_index(db.Mail_outbox, [("status", ASCENDING), ("next_attempt_at", ASCENDING)])
+    create_index(db.Mail_outbox, [("sent_at", ASCENDING)], expireAfterSeconds=7 * 24 * 3600)
+
+    # OTPs and reset tokens (MongoTokenStore) are removed once expires_at passes
+    create_index(db.Auth_tokens, [("expires_at", ASCENDING)], expireAfterSeconds=0)
+
+    # Rate limit buckets (MongoRateLimiter) are removed once they would be full again
+    create_index(db.Rate_limits, [("expires_at", ASCENDING)], expireAfterSeconds=0)
+
+    # Users are looked up by normalized name (task assignment) and email (login, email checks).
+    # The unique email index fails on duplicate emails, so the name index is built first
+    create_index(db.User_management, [("name_lc", ASCENDING)])
+    create_index(db.User_management, [("email", ASCENDING)], unique=True)
+
+    return failures
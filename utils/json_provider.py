@@ -0,0 +1,42 @@
+from datetime import datetime, date
+from bson import ObjectId, Decimal128, Timestamp
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # optional, falls back to the standard library encoder
+    orjson = None
+
+def mongo_default(o):
+    """Encode BSON and date types that the JSON encoders don't handle natively."""
+    if isinstance(o, ObjectId):
+        return str(o)
+    if isinstance(o, datetime):
+        return o.isoformat()
+    if isinstance(o, date):
+        return o.isoformat()
+    if isinstance(o, Decimal128):
+        return str(o.to_decimal())
+    if isinstance(o, Timestamp):
+        return o.as_datetime().isoformat()
+    return DefaultJSONProvider.default(o)
+
+class MongoJSONProvider(DefaultJSONProvider):
+    """JSON provider that serializes Mongo documents directly.
+
+    ObjectId becomes its hex string and datetimes ISO 8601, so handlers can
+    return documents without converting them first. Uses orjson when installed.
+    """
+
+    default = staticmethod(mongo_default)
+
+    def dumps(self, obj, **kwargs):
+        if orjson is None or set(kwargs) - {'indent', 'separators'}:
+            return super().dumps(obj, **kwargs)
+
+        option = orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if kwargs.get('indent'):
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=self.default, option=option).decode('utf-8')
@@ -1,15 +1,22 @@
 import jwt
 import datetime
 from functools import wraps
-from flask import current_app, request, jsonify
+from flask import current_app, request, jsonify, g
+from utils.user_loader import get_token_version
 
-def encode_auth_token(user_id):
+def encode_auth_token(user_id, role=None, name=None, token_version=None):
     try:
         payload = {
             'exp': datetime.datetime.utcnow() + datetime.timedelta(days=1),
             'iat': datetime.datetime.utcnow(),
             'sub': user_id
         }
+        # Signed identity claims let authorization skip the user lookup;
+        # 'ver' is checked against the user's token_version to revoke stale tokens
+        if token_version is not None:
+            payload['role'] = role
+            payload['name'] = name
+            payload['ver'] = token_version
         return jwt.encode(payload, current_app.config['SECRET_KEY'], algorithm='HS256')
     except Exception as e:
         print(f"Error encoding token: {str(e)}")
@@ -49,6 +56,13 @@ def token_required(f):
         except jwt.InvalidTokenError:
             return jsonify({'msg': 'Invalid token.Please log in again.'}), 401
 
+        # Tokens carrying claims are revoked when the user's token_version changes
+        if 'ver' in payload and get_token_version(user_id) != payload['ver']:
+            return jsonify({'msg': 'Token has been revoked. Please log in again.'}), 401
+
+        # Make the authenticated user available to load_user()/load_identity()
+        g.user_id = user_id
+        g.token_claims = payload
         return f(user_id, *args, **kwargs)
 
     return decorated_function
@@ -0,0 +1,206 @@
+import os
+import smtplib
+import threading
+from datetime import datetime, timedelta
+from bson import ObjectId
+from flask import current_app
+from flask_mail import Message
+from pymongo import ReturnDocument
+from utils.metrics import SMTP_SENDS
+
+# Outbox of emails stored in the Mail_outbox collection and delivered by a
+# background worker, so request handlers never wait on the SMTP relay.
+#
+# status: pending -> sending -> sent
+#                            -> pending (retry with backoff) -> failed
+#
+# A claim holds a mail for MAIL_OUTBOX_LEASE seconds under a fresh lock_id. The
+# lease is renewed right before each send, so mail still waiting in a batch
+# behind a slow relay can expire and be taken over by another worker; the
+# renewal then fails on the lock_id and the mail is skipped instead of sent twice.
+
+def get_outbox(db=None):
+    return (db if db is not None else current_app.config['MONGO_DB']).Mail_outbox
+
+def enqueue_mail(subject, recipients, body):
+    """Queue an email for delivery and return its outbox id."""
+    now = datetime.utcnow()
+    result = get_outbox().insert_one({
+        "subject": subject,
+        "sender": current_app.config['MAIL_USERNAME'],
+        "recipients": recipients,
+        "body": body,
+        "status": "pending",
+        "attempts": 0,
+        "last_error": None,
+        "created_at": now,
+        "next_attempt_at": now
+    })
+    if current_app.config.get('MAIL_OUTBOX_WORKER', True):
+        ensure_outbox_worker(current_app._get_current_object()).wakeup.set()
+    return result.inserted_id
+
+def get_mail_status(mail_id):
+    # last_error is left out: SMTP errors usually quote the recipient address
+    return get_outbox().find_one(
+        {"_id": mail_id},
+        {"status": 1, "attempts": 1, "created_at": 1, "sent_at": 1}
+    )
+
+class OutboxWorker(threading.Thread):
+    """Drains the outbox in batches over a single reused SMTP connection."""
+
+    def __init__(self, app):
+        super().__init__(name='mail-outbox', daemon=True)
+        self.app = app
+        self.pid = os.getpid()
+        self.wakeup = threading.Event()
+        self.stopping = threading.Event()
+        self.batch_size = int(app.config.get('MAIL_OUTBOX_BATCH_SIZE', 50))
+        self.max_attempts = int(app.config.get('MAIL_OUTBOX_MAX_ATTEMPTS', 5))
+        self.poll_interval = float(app.config.get('MAIL_OUTBOX_POLL_INTERVAL', 5))
+        self.lease = timedelta(seconds=float(app.config.get('MAIL_OUTBOX_LEASE', 60)))
+
+    def stop(self):
+        self.stopping.set()
+        self.wakeup.set()
+
+    def run(self):
+        with self.app.app_context():
+            while not self.stopping.is_set():
+                try:
+                    sent_any = self.drain()
+                except Exception as e:
+                    self.app.logger.warning(f"Mail outbox worker error: {e}")
+                    sent_any = False
+                if not sent_any:
+                    self.wakeup.wait(self.poll_interval)
+                    self.wakeup.clear()
+
+    def drain(self):
+        """Send queued mail until the outbox is empty. Returns True if anything was claimed."""
+        batch = self.claim_batch()
+        if not batch:
+            return False
+
+        mail = self.app.extensions['mail']
+        connection = mail.connect()
+        try:
+            connection.__enter__()
+        except Exception as e:
+            # Relay unreachable: release the whole batch for a later retry
+            for doc in batch:
+                self.mark_failed(doc, e)
+            return True
+
+        try:
+            while batch and not self.stopping.is_set():
+                for index, doc in enumerate(batch):
+                    if not self.renew_lease(doc):
+                        continue
+                    try:
+                        connection.send(Message(
+                            doc["subject"],
+                            sender=doc["sender"],
+                            recipients=doc["recipients"],
+                            body=doc["body"]
+                        ))
+                    except smtplib.SMTPServerDisconnected as e:
+                        SMTP_SENDS.inc('failed')
+                        # The connection is gone; retry the rest of the batch later
+                        for pending in batch[index:]:
+                            self.mark_failed(pending, e)
+                        return True
+                    except Exception as e:
+                        SMTP_SENDS.inc('failed')
+                        self.mark_failed(doc, e)
+                    else:
+                        SMTP_SENDS.inc('sent')
+                        self.mark_sent(doc)
+                batch = self.claim_batch()
+        finally:
+            try:
+                connection.__exit__(None, None, None)
+            except Exception:
+                pass
+        return True
+
+    def claim_batch(self):
+        outbox = get_outbox()
+        now = datetime.utcnow()
+        batch = []
+        for _ in range(self.batch_size):
+            # Pending mail that is due, or mail whose lease ran out (claimer died or fell behind)
+            doc = outbox.find_one_and_update(
+                {"$or": [
+                    {"status": "pending", "next_attempt_at": {"$lte": now}},
+                    {"status": "sending", "locked_until": {"$lt": now}}
+                ]},
+                {"$set": {"status": "sending", "locked_until": now + self.lease, "lock_id": ObjectId()}},
+                sort=[("next_attempt_at", 1)],
+                return_document=ReturnDocument.AFTER
+            )
+            if doc is None:
+                break
+            batch.append(doc)
+        return batch
+
+    def renew_lease(self, doc):
+        """Extend the claim on `doc` before sending it; False if another worker has taken it over."""
+        result = get_outbox().update_one(
+            {"_id": doc["_id"], "status": "sending", "lock_id": doc["lock_id"]},
+            {"$set": {"locked_until": datetime.utcnow() + self.lease}}
+        )
+        return result.matched_count == 1
+
+    def mark_sent(self, doc):
+        get_outbox().update_one(
+            {"_id": doc["_id"], "lock_id": doc["lock_id"]},
+            {
+                "$set": {"status": "sent", "sent_at": datetime.utcnow(), "last_error": None},
+                "$inc": {"attempts": 1},
+                "$unset": {"locked_until": "", "lock_id": ""}
+            }
+        )
+
+    def mark_failed(self, doc, error):
+        attempts = doc.get("attempts", 0) + 1
+        update = {"attempts": attempts, "last_error": str(error)}
+        if attempts >= self.max_attempts:
+            update["status"] = "failed"
+        else:
+            # Exponential backoff: 30s, 1m, 2m, 4m, ...
+            update["status"] = "pending"
+            update["next_attempt_at"] = datetime.utcnow() + timedelta(seconds=30 * 2 ** (attempts - 1))
+        result = get_outbox().update_one(
+            {"_id": doc["_id"], "lock_id": doc["lock_id"]},
+            {"$set": update, "$unset": {"locked_until": "", "lock_id": ""}}
+        )
+        if result.matched_count == 0:
+            return  # Taken over by another worker after the lease expired
+        self.app.logger.warning(f"Failed to send mail {doc['_id']} (attempt {attempts}): {error}")
+
+_worker_lock = threading.Lock()
+
+def ensure_outbox_worker(app):
+    """Start the outbox worker for this process if it is not running yet.
+
+    Checked against the pid so a worker inherited through fork() is replaced.
+    """
+    worker = app.extensions.get('mail_outbox_worker')
+    if worker is not None and worker.pid == os.getpid() and worker.is_alive():
+        return worker
+    with _worker_lock:
+        worker = app.extensions.get('mail_outbox_worker')
+        if worker is None or worker.pid != os.getpid() or not worker.is_alive():
+            worker = OutboxWorker(app)
+            worker.start()
+            app.extensions['mail_outbox_worker'] = worker
+    return worker
+
+def stop_outbox_worker(app, timeout=10):
+    """Stop this process's outbox worker, letting it finish the mail it is sending."""
+    worker = app.extensions.get('mail_outbox_worker')
+    if worker is not None and worker.pid == os.getpid() and worker.is_alive():
+        worker.stop()
+        worker.join(timeout)
@@ -0,0 +1,199 @@
+import bisect
+import threading
+import time
+from flask import g, request
+from pymongo import monitoring
+
+# Process-local metrics rendered in the Prometheus text format at /metrics.
+# Recording is a lock and a couple of integer increments, cheap enough to stay
+# on in production. Each worker process keeps its own values.
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+def escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def format_labels(names, values, extra=None):
+    pairs = list(zip(names, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{escape_label(value)}"' for name, value in pairs) + '}'
+
+def format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Counter:
+    kind = 'counter'
+
+    def __init__(self, name, description, labels=()):
+        self.name = name
+        self.description = description
+        self.labels = labels
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            values = dict(self._values)
+        for label_values, value in sorted(values.items()):
+            yield f"{self.name}{format_labels(self.labels, label_values)} {format_value(value)}"
+
+class Gauge:
+    """Gauge read from a callback returning {label values tuple: value} at scrape time."""
+    kind = 'gauge'
+
+    def __init__(self, name, description, labels, callback):
+        self.name = name
+        self.description = description
+        self.labels = labels
+        self.callback = callback
+
+    def samples(self):
+        for label_values, value in sorted(self.callback().items()):
+            yield f"{self.name}{format_labels(self.labels, label_values)} {format_value(value)}"
+
+class Histogram:
+    kind = 'histogram'
+
+    def __init__(self, name, description, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.description = description
+        self.labels = labels
+        self.buckets = tuple(buckets)
+        self._series = {}  # label values -> [per-bucket counts..., +Inf count, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    def samples(self):
+        with self._lock:
+            series_by_labels = {labels: list(series) for labels, series in self._series.items()}
+        for label_values, series in sorted(series_by_labels.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), series[:-1]):
+                cumulative += count
+                le = ('le', bound if bound == '+Inf' else format_value(float(bound)))
+                yield f"{self.name}_bucket{format_labels(self.labels, label_values, le)} {cumulative}"
+            yield f"{self.name}_sum{format_labels(self.labels, label_values)} {format_value(series[-1])}"
+            yield f"{self.name}_count{format_labels(self.labels, label_values)} {cumulative}"
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, description, labels=()):
+        return self.register(Counter(name, description, labels))
+
+    def histogram(self, name, description, labels=(), buckets=LATENCY_BUCKETS):
+        return self.register(Histogram(name, description, labels, buckets))
+
+    def render(self, extra=()):
+        lines = []
+        for metric in list(self._metrics) + list(extra):
+            lines.append(f"# HELP {metric.name} {metric.description}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return '\n'.join(lines) + '\n'
+
+REGISTRY = Registry()
+
+REQUEST_DURATION = REGISTRY.histogram(
+    'http_request_duration_seconds', 'Time to build the response, per endpoint.',
+    ('blueprint', 'endpoint', 'method')
+)
+REQUESTS = REGISTRY.counter(
+    'http_requests_total', 'Responses by endpoint and status code.',
+    ('blueprint', 'endpoint', 'method', 'status')
+)
+MONGO_COMMAND_DURATION = REGISTRY.histogram(
+    'mongo_command_duration_seconds', 'MongoDB command round trip time.',
+    ('collection', 'command')
+)
+MONGO_COMMAND_FAILURES = REGISTRY.counter(
+    'mongo_command_failures_total', 'Failed MongoDB commands.', ('collection', 'command')
+)
+PASSWORD_HASHES = REGISTRY.counter(
+    'password_hashes_total', 'Password hashes computed, by operation (hash or verify).', ('operation',)
+)
+PASSWORD_HASHES_REJECTED = REGISTRY.counter(
+    'password_hashes_rejected_total', 'Hashes refused because the hashing pool was saturated.'
+)
+SMTP_SENDS = REGISTRY.counter('smtp_sends_total', 'Emails handed to the SMTP relay, by result.', ('result',))
+
+class CommandMetrics(monitoring.CommandListener):
+    """Times every MongoDB command by collection and command name."""
+
+    def __init__(self):
+        self._collections = {}  # (connection, request id) -> collection of a started command
+
+    @staticmethod
+    def collection_of(event):
+        command = event.command
+        collection = command.get(event.command_name)
+        if not isinstance(collection, str):
+            # getMore carries the cursor id there and the collection separately
+            collection = command.get('collection', '')
+        return collection if isinstance(collection, str) else ''
+
+    def started(self, event):
+        self._collections[(event.connection_id, event.request_id)] = self.collection_of(event)
+
+    def succeeded(self, event):
+        collection = self._collections.pop((event.connection_id, event.request_id), '')
+        MONGO_COMMAND_DURATION.observe(event.duration_micros / 1e6, collection, event.command_name)
+
+    def failed(self, event):
+        collection = self._collections.pop((event.connection_id, event.request_id), '')
+        MONGO_COMMAND_DURATION.observe(event.duration_micros / 1e6, collection, event.command_name)
+        MONGO_COMMAND_FAILURES.inc(collection, event.command_name)
+
+def pool_gauges(connection):
+    """Gauges reading the MongoConnection pool counters of this process."""
+    def read(field):
+        return lambda: {(server,): stats[field] for server, stats in connection.pool_stats.snapshot().items()}
+    return [
+        Gauge(f'mongo_pool_{field}', description, ('server',), read(field))
+        for field, description in (
+            ('open', 'Open pooled connections.'),
+            ('in_use', 'Pooled connections checked out.'),
+            ('waiting', 'Threads waiting for a pooled connection.'),
+            ('checkout_failures', 'Failed connection checkouts.'),
+        )
+    ]
+
+def render_metrics(app):
+    return REGISTRY.render(extra=app.extensions.get('metrics_gauges', ()))
+
+def init_metrics(app):
+    @app.before_request
+    def start_timer():
+        g.request_started = time.perf_counter()
+
+    @app.after_request
+    def record_request(response):
+        started = g.pop('request_started', None)
+        if started is not None:
+            blueprint = request.blueprint or ''
+            endpoint = request.endpoint or 'unmatched'  # 404s are not split by path
+            REQUEST_DURATION.observe(time.perf_counter() - started, blueprint, endpoint, request.method)
+            REQUESTS.inc(blueprint, endpoint, request.method, str(response.status_code))
+        return response
+
+    app.extensions['metrics_gauges'] = pool_gauges(app.config['MONGO_DB'])
@@ -0,0 +1,67 @@
+from datetime import datetime
+from utils.task_stats import rebuild_task_stats
+
+COMMENT_PREVIEW_LENGTH = 200
+
+# One-shot data migrations. Each one runs once per database; applied names are
+# recorded in the Schema_migrations collection. Migrations must be idempotent
+# since several workers may start at the same time.
+
+def normalize_assignee_and_user_fields(db):
+    db.Task_management.update_many(
+        {"assigned_to_lc": {"$exists": False}},
+        [{"$set": {"assigned_to_lc": {"$toLower": "$assigned_to"}}}]
+    )
+    db.User_management.update_many(
+        {"name_lc": {"$exists": False}},
+        [{"$set": {"name_lc": {"$toLower": "$name"}, "email": {"$toLower": "$email"}}}]
+    )
+
+def move_comments_to_collection(db):
+    for task in db.Task_management.find({"comments.0": {"$exists": True}}, {"comments": 1}):
+        comments = task["comments"]
+        # Drop any copies left behind by an interrupted run before re-inserting
+        db.Task_comments.delete_many({"task_id": task["_id"]})
+        db.Task_comments.insert_many([dict(comment, task_id=task["_id"]) for comment in comments])
+        latest = comments[-1]
+        db.Task_management.update_one(
+            {"_id": task["_id"]},
+            {
+                "$set": {
+                    "comment_count": len(comments),
+                    "latest_comment": {
+                        "text": latest.get("text", "")[:COMMENT_PREVIEW_LENGTH],
+                        "author": latest.get("author"),
+                        "createdAt": latest.get("createdAt")
+                    }
+                },
+                "$unset": {"comments": ""}
+            }
+        )
+    db.Task_management.update_many({"comments": {"$exists": True}}, {"$unset": {"comments": ""}})
+
+def move_history_to_audit_log(db):
+    for task in db.Task_management.find({"history.0": {"$exists": True}}, {"history": 1}):
+        db.Task_history.delete_many({"task_id": task["_id"]})
+        db.Task_history.insert_many([dict(entry, task_id=task["_id"]) for entry in task["history"]])
+        db.Task_management.update_one({"_id": task["_id"]}, {"$unset": {"history": ""}})
+    db.Task_management.update_many({"history": {"$exists": True}}, {"$unset": {"history": ""}})
+
+MIGRATIONS = [
+    ("0001_normalize_assignee_and_user_fields", normalize_assignee_and_user_fields),
+    ("0002_move_comments_to_collection", move_comments_to_collection),
+    ("0003_move_history_to_audit_log", move_history_to_audit_log),
+    ("0004_build_task_stats", rebuild_task_stats),
+]
+
+def run_migrations(db):
+    applied = {doc["_id"] for doc in db.Schema_migrations.find({}, {"_id": 1})}
+    for name, migration in MIGRATIONS:
+        if name in applied:
+            continue
+        migration(db)
+        db.Schema_migrations.update_one(
+            {"_id": name},
+            {"$setOnInsert": {"applied_at": datetime.utcnow()}},
+            upsert=True
+        )
@@ -0,0 +1,201 @@
+import json
+import os
+import threading
+import weakref
+from pymongo import MongoClient, monitoring
+from pymongo.database import Database
+from pymongo.read_preferences import read_pref_mode_from_name
+from pymongo.write_concern import WriteConcern
+
+# MongoDB connection configured from the environment. The client is created on
+# first use in each process, so a client opened by the parent (migrations and
+# index builds at startup) is never shared with forked workers: the fork hook
+# below drops it in the child, which then connects on its own.
+#
+# MONGO_URI                          connection string (default mongodb://localhost:27017)
+# MONGO_DB_NAME                      database name (default flask_db)
+# MONGO_MAX_POOL_SIZE                connections per server per process (default 100)
+# MONGO_MIN_POOL_SIZE                connections kept open (default 0)
+# MONGO_MAX_IDLE_TIME_MS             close pooled connections idle this long
+# MONGO_WAIT_QUEUE_TIMEOUT_MS        max wait for a free pooled connection
+# MONGO_SERVER_SELECTION_TIMEOUT_MS  fail fast when no server is reachable (default 5000)
+# MONGO_CONNECT_TIMEOUT_MS, MONGO_SOCKET_TIMEOUT_MS
+# MONGO_READ_PREFERENCE              primary, primaryPreferred, secondary, ...
+# MONGO_WRITE_CONCERNS               per-collection write concerns as JSON, e.g.
+#                                    {"Task_history": {"w": 1}, "Auth_tokens": {"w": "majority"}}
+
+CLIENT_OPTIONS = {
+    'maxPoolSize': ('MONGO_MAX_POOL_SIZE', int),
+    'minPoolSize': ('MONGO_MIN_POOL_SIZE', int),
+    'maxIdleTimeMS': ('MONGO_MAX_IDLE_TIME_MS', int),
+    'waitQueueTimeoutMS': ('MONGO_WAIT_QUEUE_TIMEOUT_MS', int),
+    'serverSelectionTimeoutMS': ('MONGO_SERVER_SELECTION_TIMEOUT_MS', int),
+    'connectTimeoutMS': ('MONGO_CONNECT_TIMEOUT_MS', int),
+    'socketTimeoutMS': ('MONGO_SOCKET_TIMEOUT_MS', int),
+    'readPreference': ('MONGO_READ_PREFERENCE', str),
+}
+
+def mongo_config_from_env(app):
+    app.config['MONGO_URI'] = os.getenv('MONGO_URI', 'mongodb://localhost:27017')
+    app.config['MONGO_DB_NAME'] = os.getenv('MONGO_DB_NAME', 'flask_db')
+    app.config['MONGO_SERVER_SELECTION_TIMEOUT_MS'] = int(os.getenv('MONGO_SERVER_SELECTION_TIMEOUT_MS', 5000))
+    for option, (key, cast) in CLIENT_OPTIONS.items():
+        if os.getenv(key) is not None:
+            app.config[key] = cast(os.getenv(key))
+    app.config['MONGO_WRITE_CONCERNS'] = json.loads(os.getenv('MONGO_WRITE_CONCERNS', '{}'))
+
+class PoolStats(monitoring.ConnectionPoolListener):
+    """Connection pool counters per server, fed by pymongo's pool events."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._servers = {}
+
+    def _server(self, address):
+        key = f"{address[0]}:{address[1]}"
+        server = self._servers.get(key)
+        if server is None:
+            server = self._servers[key] = {
+                'open': 0, 'in_use': 0, 'waiting': 0,
+                'created': 0, 'closed': 0, 'checkouts': 0,
+                'checkout_failures': 0, 'cleared': 0,
+                'checkout_wait_ms_total': 0.0, 'checkout_wait_ms_max': 0.0
+            }
+        return server
+
+    def _count(self, address, **deltas):
+        with self._lock:
+            server = self._server(address)
+            for name, delta in deltas.items():
+                server[name] += delta
+
+    def snapshot(self):
+        with self._lock:
+            return {address: dict(server) for address, server in self._servers.items()}
+
+    def reset(self):
+        with self._lock:
+            self._servers.clear()
+
+    def pool_created(self, event):
+        self._count(event.address)
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        self._count(event.address, cleared=1)
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        self._count(event.address, created=1, open=1)
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        self._count(event.address, closed=1, open=-1)
+
+    def connection_check_out_started(self, event):
+        self._count(event.address, waiting=1)
+
+    def connection_check_out_failed(self, event):
+        self._count(event.address, waiting=-1, checkout_failures=1)
+
+    def connection_checked_out(self, event):
+        wait_ms = (getattr(event, 'duration', None) or 0) * 1000
+        with self._lock:
+            server = self._server(event.address)
+            server['waiting'] -= 1
+            server['in_use'] += 1
+            server['checkouts'] += 1
+            server['checkout_wait_ms_total'] += wait_ms
+            server['checkout_wait_ms_max'] = max(server['checkout_wait_ms_max'], wait_ms)
+
+    def connection_checked_in(self, event):
+        self._count(event.address, in_use=-1)
+
+_connections = weakref.WeakSet()
+
+class MongoConnection:
+    """Lazily connected, per-process stand-in for the application database.
+
+    Collections are read as attributes (`db.Task_management`), like on a
+    pymongo Database, with any write concern configured for them applied.
+    """
+
+    def __init__(self, uri, db_name, client_options=None, write_concerns=None, event_listeners=()):
+        self.uri = uri
+        self.db_name = db_name
+        self.client_options = client_options or {}
+        self.write_concerns = {
+            name: WriteConcern(**options) for name, options in (write_concerns or {}).items()
+        }
+        self.pool_stats = PoolStats()
+        self.event_listeners = [self.pool_stats, *event_listeners]
+        self._client = None
+        self._pid = None
+        self._lock = threading.Lock()
+        _connections.add(self)
+
+    @classmethod
+    def from_config(cls, config, event_listeners=()):
+        options = {
+            option: config[key] for option, (key, _) in CLIENT_OPTIONS.items() if config.get(key) is not None
+        }
+        if 'readPreference' in options:
+            read_pref_mode_from_name(options['readPreference'])  # reject unknown names at startup
+        return cls(
+            config['MONGO_URI'], config['MONGO_DB_NAME'], options,
+            config.get('MONGO_WRITE_CONCERNS'), event_listeners
+        )
+
+    @property
+    def client(self):
+        if self._client is None or self._pid != os.getpid():
+            with self._lock:
+                if self._client is None or self._pid != os.getpid():
+                    self._client = MongoClient(self.uri, event_listeners=self.event_listeners, **self.client_options)
+                    self._pid = os.getpid()
+        return self._client
+
+    @property
+    def database(self):
+        return self.client.get_database(self.db_name)
+
+    def get_collection(self, name):
+        return self.database.get_collection(name, write_concern=self.write_concerns.get(name))
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        # Database methods (command, list_collection_names, ...) pass through
+        if hasattr(Database, name):
+            return getattr(self.database, name)
+        return self.get_collection(name)
+
+    def __getitem__(self, name):
+        return self.get_collection(name)
+
+    def reset_after_fork(self):
+        # The parent's client and sockets must not be used (or closed) in the child
+        with self._lock:
+            self._client = None
+            self._pid = None
+        self.pool_stats.reset()
+
+    def close(self):
+        with self._lock:
+            if self._client is not None and self._pid == os.getpid():
+                self._client.close()
+            self._client = None
+            self._pid = None
+
+def reset_connections_after_fork():
+    for connection in list(_connections):
+        connection.reset_after_fork()
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=reset_connections_after_fork)
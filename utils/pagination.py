@@ -0,0 +1,56 @@
+import base64
+import json
+from datetime import datetime
+from bson import ObjectId
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+def parse_limit(value, default=DEFAULT_PAGE_SIZE, maximum=MAX_PAGE_SIZE):
+    """Parse the `limit` query parameter, clamped to [1, maximum]."""
+    if value is None or value == '':
+        return default
+    try:
+        limit = int(value)
+    except (TypeError, ValueError):
+        return None
+    if limit < 1:
+        return None
+    return min(limit, maximum)
+
+def encode_cursor(data):
+    """Encode a dict into an opaque, url-safe cursor token."""
+    raw = json.dumps(data, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+def decode_cursor(token):
+    """Decode a cursor token produced by encode_cursor. Returns None if it is malformed."""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except (ValueError, TypeError):
+        return None
+    return data if isinstance(data, dict) else None
+
+def keyset_filter(cursor, sort_field):
+    """Build the range filter for the page after `cursor`, sorted by (sort_field, _id) descending."""
+    try:
+        last_value = cursor['v']
+        if isinstance(last_value, dict):
+            last_value = datetime.fromisoformat(last_value['t'])
+        last_id = ObjectId(cursor['id'])
+    except Exception:
+        return None
+    return {
+        "$or": [
+            {sort_field: {"$lt": last_value}},
+            {sort_field: last_value, "_id": {"$lt": last_id}}
+        ]
+    }
+
+def next_keyset_cursor(last_doc, sort_field):
+    """Cursor pointing just after the last document of the current page."""
+    value = last_doc.get(sort_field)
+    if isinstance(value, datetime):
+        value = {'t': value.isoformat()}
+    return encode_cursor({'v': value, 'id': str(last_doc['_id'])})
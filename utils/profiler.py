@@ -0,0 +1,203 @@
+import os
+import queue
+import threading
+import time
+from flask import has_request_context, request
+from pymongo import monitoring
+
+# Opt-in slow query profiler. Commands slower than SLOW_QUERY_MS are grouped by
+# query shape (the filter/sort/pipeline with every value replaced by "?", so no
+# user data is kept). Each shape is explained in a background thread, at most
+# once per SLOW_QUERY_EXPLAIN_INTERVAL seconds, to find collection scans and
+# queries that examine many more documents than they return.
+#
+# SLOW_QUERY_MS                    threshold in milliseconds (unset or 0: off)
+# SLOW_QUERY_EXPLAIN_INTERVAL      seconds between explains of one shape (default 300)
+# SLOW_QUERY_MAX_SHAPES            shapes kept per process (default 500)
+
+EXPLAINABLE_COMMANDS = {'find', 'aggregate', 'count', 'distinct', 'update', 'delete', 'findAndModify'}
+SHAPE_FIELDS = ('filter', 'query', 'sort', 'pipeline', 'key')
+# Session and transport fields the explain command doesn't accept
+STRIPPED_FIELDS = {'lsid', 'txnNumber', 'autocommit', 'startTransaction', 'writeConcern', 'readConcern'}
+# Examined/returned ratio above which a plan is flagged even if it uses an index
+EXAMINED_RATIO_WARNING = 100
+
+def query_shape(value):
+    """The structure of a query with the values blanked out."""
+    if isinstance(value, dict):
+        return {key: query_shape(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        shapes = [query_shape(item) for item in value]
+        # $in: [1, 2, 3] and $in: [1] have the same shape
+        return shapes[:1] if all(shape == '?' for shape in shapes) else shapes
+    return '?'
+
+def command_shape(command_name, command):
+    parts = {field: command[field] for field in SHAPE_FIELDS if field in command}
+    if command_name == 'update':
+        parts['q'] = [statement.get('q') for statement in command.get('updates', [])[:1]]
+    elif command_name == 'delete':
+        parts['q'] = [statement.get('q') for statement in command.get('deletes', [])[:1]]
+    return query_shape(parts)
+
+def find_key(document, key):
+    """First value of `key` anywhere in a nested explain output."""
+    if isinstance(document, dict):
+        if key in document:
+            return document[key]
+        children = document.values()
+    elif isinstance(document, list):
+        children = document
+    else:
+        return None
+    for child in children:
+        found = find_key(child, key)
+        if found is not None:
+            return found
+    return None
+
+def plan_stages(plan):
+    stages = []
+    while isinstance(plan, dict):
+        if 'stage' in plan:
+            stages.append(plan['stage'])
+        for child in plan.get('inputStages', []):
+            stages.extend(plan_stages(child))
+        plan = plan.get('inputStage') or plan.get('queryPlan')
+    return stages
+
+def summarize_explain(explain):
+    winning_plan = find_key(explain, 'winningPlan') or {}
+    stats = find_key(explain, 'executionStats') or {}
+    stages = plan_stages(winning_plan)
+    examined = stats.get('totalDocsExamined', 0)
+    returned = stats.get('nReturned', 0)
+    return {
+        'stages': stages,
+        'collscan': 'COLLSCAN' in stages,
+        'docs_examined': examined,
+        'keys_examined': stats.get('totalKeysExamined', 0),
+        'returned': returned,
+        'examined_per_returned': examined / max(returned, 1)
+    }
+
+class SlowQueryProfiler(monitoring.CommandListener):
+    def __init__(self, app, threshold_ms, explain_interval=300, max_shapes=500):
+        self.app = app
+        self.threshold_ms = threshold_ms
+        self.explain_interval = explain_interval
+        self.max_shapes = max_shapes
+        self._pending = {}  # (connection, request id) -> (database, command, route)
+        self._shapes = {}
+        self._lock = threading.Lock()
+        self._explain_queue = queue.Queue(100)
+        self._worker = None
+
+    @classmethod
+    def from_env(cls, app):
+        threshold = float(os.getenv('SLOW_QUERY_MS', 0))
+        if threshold <= 0:
+            return None
+        return cls(
+            app, threshold,
+            explain_interval=float(os.getenv('SLOW_QUERY_EXPLAIN_INTERVAL', 300)),
+            max_shapes=int(os.getenv('SLOW_QUERY_MAX_SHAPES', 500))
+        )
+
+    def started(self, event):
+        if event.command_name not in EXPLAINABLE_COMMANDS:
+            return
+        route = f"{request.method} {request.endpoint or 'unmatched'}" if has_request_context() else None
+        self._pending[(event.connection_id, event.request_id)] = (event.database_name, event.command, route)
+
+    def succeeded(self, event):
+        pending = self._pending.pop((event.connection_id, event.request_id), None)
+        if pending is not None and event.duration_micros >= self.threshold_ms * 1000:
+            self.record(event.command_name, event.duration_micros / 1000, *pending)
+
+    def failed(self, event):
+        self._pending.pop((event.connection_id, event.request_id), None)
+
+    def record(self, command_name, duration_ms, database_name, command, route):
+        collection = command.get(command_name)
+        shape = command_shape(command_name, command)
+        key = (collection, command_name, repr(shape))
+        now = time.time()
+        with self._lock:
+            entry = self._shapes.get(key)
+            if entry is None:
+                if len(self._shapes) >= self.max_shapes:
+                    return
+                entry = self._shapes[key] = {
+                    'collection': collection,
+                    'command': command_name,
+                    'shape': shape,
+                    'count': 0,
+                    'total_ms': 0.0,
+                    'max_ms': 0.0,
+                    'routes': {},
+                    'plan': None,
+                    'explained_at': 0
+                }
+            entry['count'] += 1
+            entry['total_ms'] += duration_ms
+            entry['max_ms'] = max(entry['max_ms'], duration_ms)
+            if route:
+                entry['routes'][route] = entry['routes'].get(route, 0) + 1
+            explain = now - entry['explained_at'] >= self.explain_interval
+            if explain:
+                entry['explained_at'] = now
+        if explain:
+            self.schedule_explain(key, database_name, command)
+
+    def schedule_explain(self, key, database_name, command):
+        try:
+            self._explain_queue.put_nowait((key, database_name, command))
+        except queue.Full:
+            return
+        if self._worker is None or self._worker.pid != os.getpid() or not self._worker.is_alive():
+            with self._lock:
+                if self._worker is None or self._worker.pid != os.getpid() or not self._worker.is_alive():
+                    self._worker = threading.Thread(target=self.explain_loop, name='slow-query-explain', daemon=True)
+                    self._worker.pid = os.getpid()
+                    self._worker.start()
+
+    def explain_loop(self):
+        while True:
+            key, database_name, command = self._explain_queue.get()
+            try:
+                self.explain(key, database_name, command)
+            except Exception as e:
+                self.app.logger.warning(f"Slow query explain failed for {key[0]}.{key[1]}: {e}")
+
+    def explain(self, key, database_name, command):
+        explained = {name: value for name, value in command.items()
+                     if name not in STRIPPED_FIELDS and not name.startswith('$')}
+        database = self.app.config['MONGO_DB'].client.get_database(database_name)
+        plan = summarize_explain(database.command({'explain': explained, 'verbosity': 'executionStats'}))
+        with self._lock:
+            entry = self._shapes.get(key)
+            if entry is None:
+                return
+            entry['plan'] = plan
+            routes = ', '.join(entry['routes']) or 'background'
+        if plan['collscan'] or plan['examined_per_returned'] >= EXAMINED_RATIO_WARNING:
+            self.app.logger.warning(
+                f"Slow query on {key[0]} ({key[1]}, {'COLLSCAN' if plan['collscan'] else 'index'}): "
+                f"examined {plan['docs_examined']} docs for {plan['returned']} returned; "
+                f"shape {key[2]}; from {routes}"
+            )
+
+    def report(self, limit=50):
+        """Slow query shapes, the most total time first."""
+        with self._lock:
+            entries = [dict(entry, routes=dict(entry['routes'])) for entry in self._shapes.values()]
+        entries.sort(key=lambda entry: entry['total_ms'], reverse=True)
+        for entry in entries:
+            entry['avg_ms'] = entry['total_ms'] / entry['count']
+            del entry['explained_at']
+        return entries[:limit]
+
+    def reset(self):
+        with self._lock:
+            self._shapes.clear()
@@ -0,0 +1,20 @@
+# Sparse fieldsets: a `fields=a,b,c` query parameter names the fields a client
+# needs, and only those are read from Mongo and returned.
+
+def parse_fields(value, allowed, default):
+    """Split the `fields` query parameter; returns None if it names an unknown field."""
+    if not value:
+        return list(default)
+    fields = [field.strip() for field in value.split(',') if field.strip()]
+    if not fields or any(field not in allowed for field in fields):
+        return None
+    return fields
+
+def fields_projection(fields, field_map=None, required=()):
+    """Projection reading `fields` (mapped to their document fields) and the `required` document fields."""
+    field_map = field_map or {}
+    projection = {field_map.get(field, field): 1 for field in fields}
+    for field in required:
+        projection[field] = 1
+    projection.setdefault("_id", 0)
+    return projection
@@ -0,0 +1,155 @@
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from functools import wraps
+from flask import current_app, jsonify, request
+from pymongo import ReturnDocument
+from pymongo.errors import PyMongoError
+
+# Token-bucket rate limits for the unauthenticated endpoints that cost a password
+# hash, a database lookup or an email. Each limited endpoint has a bucket per
+# client IP and, when the body has an email, one per email address. A bucket
+# holds up to `capacity` tokens and refills at capacity / period per second;
+# each request takes one token or is rejected with 429 and Retry-After.
+#
+# RATE_LIMIT_BACKEND  'memory' (per process, default), 'mongo' (shared by all
+#                     workers, Rate_limits collection) or 'off'
+# RATE_LIMIT_<NAME>_IP, RATE_LIMIT_<NAME>_EMAIL  override a limit as "capacity/period_seconds"
+
+DEFAULT_LIMITS = {
+    'login': {'ip': '20/60', 'email': '5/60'},
+    'email_check': {'ip': '30/60'},
+    'send_otp': {'ip': '10/600', 'email': '3/600'},
+    'request_reset': {'ip': '10/600', 'email': '3/3600'},
+}
+
+def parse_limit_spec(spec):
+    capacity, period = spec.split('/')
+    return int(capacity), float(period)
+
+class MemoryRateLimiter:
+    """Buckets in a dict; the least recently used ones are dropped past max_keys."""
+
+    def __init__(self, max_keys=100000):
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()  # key -> (tokens, updated_at)
+        self._lock = threading.Lock()
+
+    def consume(self, key, capacity, period):
+        """Take one token. Returns 0 if allowed, else seconds until a token is available."""
+        rate = capacity / period
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated_at = self._buckets.pop(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - updated_at) * rate)
+            if tokens >= 1:
+                tokens -= 1
+                retry_after = 0
+            else:
+                retry_after = (1 - tokens) / rate
+            self._buckets[key] = (tokens, now)
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return retry_after
+
+class MongoRateLimiter:
+    """Buckets shared by all workers in the Rate_limits collection.
+
+    Refill and take happen in one pipeline update, so concurrent requests
+    never double-spend a token. Idle buckets are removed by a TTL index once
+    they would be full again.
+    """
+
+    def get_collection(self):
+        return current_app.config['MONGO_DB'].Rate_limits
+
+    def consume(self, key, capacity, period):
+        rate = capacity / period
+        now = datetime.utcnow()
+        elapsed = {"$divide": [{"$subtract": [now, {"$ifNull": ["$updated_at", now]}]}, 1000]}
+        refilled = {"$min": [capacity, {"$add": [{"$ifNull": ["$tokens", capacity]}, {"$multiply": [elapsed, rate]}]}]}
+        bucket = self.get_collection().find_one_and_update(
+            {"_id": key},
+            [
+                {"$set": {"tokens": refilled, "updated_at": now}},
+                {"$set": {"allowed": {"$gte": ["$tokens", 1]}}},
+                {"$set": {
+                    "tokens": {"$cond": ["$allowed", {"$subtract": ["$tokens", 1]}, "$tokens"]},
+                    "expires_at": now + timedelta(seconds=period)
+                }}
+            ],
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        if bucket["allowed"]:
+            return 0
+        return (1 - bucket["tokens"]) / rate
+
+def rate_limit_config_from_env(app):
+    app.config['RATE_LIMIT_BACKEND'] = os.getenv('RATE_LIMIT_BACKEND', 'memory')
+    for name in DEFAULT_LIMITS:
+        for scope in ('IP', 'EMAIL'):
+            key = f'RATE_LIMIT_{name.upper()}_{scope}'
+            if os.getenv(key):
+                parse_limit_spec(os.getenv(key))  # reject malformed limits at startup
+                app.config[key] = os.getenv(key)
+
+def init_rate_limiter(app):
+    backend = app.config.get('RATE_LIMIT_BACKEND', 'memory')
+    if backend == 'memory':
+        app.extensions['rate_limiter'] = MemoryRateLimiter()
+    elif backend == 'mongo':
+        app.extensions['rate_limiter'] = MongoRateLimiter()
+    elif backend == 'off':
+        app.extensions['rate_limiter'] = None
+    else:
+        raise ValueError(f"Unknown RATE_LIMIT_BACKEND: {backend}")
+
+def get_limits(name):
+    limits = dict(DEFAULT_LIMITS[name])
+    for scope in ('ip', 'email'):
+        override = current_app.config.get(f'RATE_LIMIT_{name.upper()}_{scope.upper()}')
+        if override:
+            limits[scope] = override
+    return {scope: parse_limit_spec(spec) for scope, spec in limits.items()}
+
+def too_many_requests(retry_after):
+    resp = jsonify({'msg': 'Too many requests, please try again later'})
+    resp.headers['Retry-After'] = str(max(1, math.ceil(retry_after)))
+    return resp, 429
+
+def rate_limit(name):
+    """Apply the `name` limits from DEFAULT_LIMITS before the view runs."""
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            limiter = current_app.extensions.get('rate_limiter')
+            if limiter is None:
+                return f(*args, **kwargs)
+
+            limits = get_limits(name)
+            buckets = [('ip', request.remote_addr or 'unknown')]
+            data = request.get_json(silent=True)
+            email = data.get('email') if isinstance(data, dict) else None
+            if isinstance(email, str) and email.strip():
+                buckets.append(('email', email.strip().lower()))
+
+            for scope, value in buckets:
+                if scope not in limits:
+                    continue
+                capacity, period = limits[scope]
+                try:
+                    retry_after = limiter.consume(f"{name}:{scope}:{value}", capacity, period)
+                except PyMongoError as e:
+                    # Limiter unavailable: let the request through rather than fail it
+                    current_app.logger.warning(f"Rate limiter error: {e}")
+                    break
+                if retry_after:
+                    return too_many_requests(retry_after)
+
+            return f(*args, **kwargs)
+        return decorated_function
+    return decorator
@@ -1,13 +1,13 @@
 from functools import wraps
-from flask import jsonify, current_app
-from bson import ObjectId
+from flask import jsonify
+from utils.user_loader import load_identity
 
 def role_required(required_roles):
     def decorator(f):
         @wraps(f)
         def decorated_function(user_id, *args, **kwargs):
-            User_management = current_app.config['MONGO_DB'].User_management
-            user = User_management.find_one({"_id": ObjectId(user_id)})
+            # Served from the token claims when present, otherwise from the (cached) user
+            user = load_identity(user_id)
 
             if not user:
                 return jsonify({'msg': 'User not found'}), 404
@@ -0,0 +1,81 @@
+import os
+from gunicorn.app.base import BaseApplication
+from utils.events import start_event_source
+from utils.hashing import shutdown_hashing_pool
+from utils.mail_outbox import ensure_outbox_worker, stop_outbox_worker
+
+# Production serving with gunicorn: the app is created once in the master and
+# forked into WEB_WORKERS processes of WEB_THREADS threads each. Nothing that
+# holds sockets or threads is shared across the fork: the MongoDB client is
+# dropped in the child (utils.mongo), the hashing pool is created per pid, and
+# the mail outbox worker and change stream reader are started in post_fork.
+#
+# HOST, PORT            bind address (default 0.0.0.0:8000)
+# WEB_WORKERS           worker processes (default: CPU count)
+# WEB_THREADS           threads per worker (default 8)
+# WEB_TIMEOUT           seconds before a silent worker is restarted (default 60)
+# WEB_GRACEFUL_TIMEOUT  seconds workers get to finish requests on shutdown (default 30)
+# WEB_MAX_REQUESTS      restart a worker after this many requests (default 0, never)
+#
+# WEB_WORKER_CLASS      'gthread' (default) or 'gevent'
+# WEB_CONNECTIONS       concurrent connections per gevent worker (default 1000)
+#
+# Under gthread a /tasks/stream connection occupies one of its worker's threads
+# until the client leaves, so run.py caps EVENT_MAX_STREAMS at half of
+# WEB_THREADS by default. gevent workers serve each connection from a greenlet
+# (run.py monkey-patches the process before the app is created), which is how
+# a worker holds thousands of idle streams; their cap leaves a tenth of
+# WEB_CONNECTIONS to regular requests.
+
+def server_options():
+    workers = int(os.getenv('WEB_WORKERS', os.cpu_count() or 1))
+    return {
+        'bind': f"{os.getenv('HOST', '0.0.0.0')}:{os.getenv('PORT', 8000)}",
+        'workers': workers,
+        'threads': int(os.getenv('WEB_THREADS', 8)),
+        'worker_class': os.getenv('WEB_WORKER_CLASS', 'gthread'),
+        'worker_connections': int(os.getenv('WEB_CONNECTIONS', 1000)),
+        'timeout': int(os.getenv('WEB_TIMEOUT', 60)),
+        'graceful_timeout': int(os.getenv('WEB_GRACEFUL_TIMEOUT', 30)),
+        'max_requests': int(os.getenv('WEB_MAX_REQUESTS', 0)),
+        'max_requests_jitter': int(os.getenv('WEB_MAX_REQUESTS', 0)) // 10,
+        'preload_app': True,
+        'accesslog': '-',
+    }
+
+def default_event_streams(options):
+    """Event streams per worker that still leave room for regular requests."""
+    if options['worker_class'] == 'gevent':
+        return max(1, options['worker_connections'] - options['worker_connections'] // 10)
+    return max(1, options['threads'] // 2)
+
+def default_hash_workers(web_workers):
+    """Share the cores between the hashing pools of all web workers."""
+    return max(1, (os.cpu_count() or 1) // max(web_workers, 1))
+
+class ProductionServer(BaseApplication):
+    def __init__(self, app, options=None):
+        self.application = app
+        self.options = options or server_options()
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            self.cfg.set(key, value)
+        self.cfg.set('post_fork', self.post_fork)
+        self.cfg.set('worker_exit', self.worker_exit)
+
+    def load(self):
+        return self.application
+
+    def post_fork(self, server, worker):
+        app = self.application
+        if app.config.get('MAIL_OUTBOX_WORKER', True):
+            ensure_outbox_worker(app)  # also drains mail queued while no worker ran
+        start_event_source(app)
+
+    def worker_exit(self, server, worker):
+        app = self.application
+        stop_outbox_worker(app)
+        shutdown_hashing_pool()
+        app.config['MONGO_DB'].close()
@@ -0,0 +1,89 @@
+import csv
+import io
+import json
+from datetime import datetime
+from bson import ObjectId
+from flask import Response
+
+# Row-by-row readers for uploaded files. They wrap the raw request stream so
+# only the current line is held in memory, whatever the upload size.
+
+def text_stream(stream):
+    return io.TextIOWrapper(io.BufferedReader(stream), encoding='utf-8', newline='')
+
+def iter_csv_rows(stream):
+    """Yield (row_number, row_dict) for a CSV upload with a header line."""
+    reader = csv.DictReader(text_stream(stream))
+    for row_number, row in enumerate(reader, start=1):
+        yield row_number, row
+
+def iter_ndjson_rows(stream):
+    """Yield (row_number, row_dict) for an NDJSON upload; malformed lines yield (row_number, None)."""
+    row_number = 0
+    for line in text_stream(stream):
+        if not line.strip():
+            continue
+        row_number += 1
+        try:
+            row = json.loads(line)
+        except ValueError:
+            row = None
+        yield row_number, row if isinstance(row, dict) else None
+
+def chunked(iterable, size):
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+# Writers for export responses. They consume a Mongo cursor lazily and yield
+# text in ~64KB pieces, so the first bytes go out before the query finishes.
+
+EXPORT_FLUSH_SIZE = 64 * 1024
+
+def export_value(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, ObjectId):
+        return str(value)
+    return value
+
+def iter_ndjson_export(docs, fields, field_map=None):
+    field_map = field_map or {}
+    buffer = io.StringIO()
+    for doc in docs:
+        row = {field: export_value(doc.get(field_map.get(field, field))) for field in fields}
+        buffer.write(json.dumps(row, default=str))
+        buffer.write('\n')
+        if buffer.tell() >= EXPORT_FLUSH_SIZE:
+            yield buffer.getvalue()
+            buffer = io.StringIO()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+def iter_csv_export(docs, fields, field_map=None):
+    field_map = field_map or {}
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(fields)
+    for doc in docs:
+        writer.writerow([export_value(doc.get(field_map.get(field, field))) for field in fields])
+        if buffer.tell() >= EXPORT_FLUSH_SIZE:
+            yield buffer.getvalue()
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+    if buffer.tell():
+        yield buffer.getvalue()
+
+def export_response(docs, fields, file_format, filename, field_map=None):
+    if file_format == 'csv':
+        body, mimetype = iter_csv_export(docs, fields, field_map), 'text/csv'
+    else:
+        body, mimetype = iter_ndjson_export(docs, fields, field_map), 'application/x-ndjson'
+    response = Response(body, mimetype=mimetype)
+    response.headers['Content-Disposition'] = f'attachment; filename={filename}.{file_format}'
+    return response
@@ -0,0 +1,87 @@
+from collections import Counter
+from datetime import date
+from flask import current_app
+from pymongo import ReplaceOne, UpdateOne
+
+# Task counts by status, priority and assignee, kept in the Task_stats collection
+# as one document per (dimension, value): {"_id": "status:pending", "count": 3}.
+# Task writes adjust them with $inc; rebuild_task_stats() recomputes them from
+# the tasks with an aggregation pipeline to repair any drift.
+
+OPEN_STATUSES = ["pending", "in_progress"]
+
+def get_task_stats_collection(db=None):
+    return (db if db is not None else current_app.config['MONGO_DB']).Task_stats
+
+def stats_keys(task):
+    """Counter documents a task contributes to."""
+    assignee = task.get("assigned_to_lc") or (task.get("assigned_to") or "").lower()
+    return [
+        ("total", "all"),
+        ("status", task.get("status")),
+        ("priority", task.get("priority_label")),
+        ("assignee", assignee)
+    ]
+
+def update_task_stats(removed=(), added=()):
+    """Apply the counter changes for tasks that were removed/replaced and added/updated."""
+    delta = Counter()
+    for task in removed:
+        delta.subtract(stats_keys(task))
+    for task in added:
+        delta.update(stats_keys(task))
+
+    operations = [
+        UpdateOne(
+            {"_id": f"{dimension}:{value}"},
+            {"$inc": {"count": count}, "$set": {"dimension": dimension, "value": value}},
+            upsert=True
+        )
+        for (dimension, value), count in delta.items() if count
+    ]
+    if operations:
+        get_task_stats_collection().bulk_write(operations, ordered=False)
+
+def read_task_stats(db=None):
+    stats = {"total": 0, "by_status": {}, "by_priority": {}, "by_assignee": {}}
+    for doc in get_task_stats_collection(db).find({"count": {"$gt": 0}}):
+        if doc["dimension"] == "total":
+            stats["total"] = doc["count"]
+        else:
+            stats[f"by_{doc['dimension']}"][doc["value"]] = doc["count"]
+
+    # Overdue depends on today's date, so it is counted (from the status/due_date index) instead of stored
+    db = db if db is not None else current_app.config['MONGO_DB']
+    stats["overdue"] = db.Task_management.count_documents({
+        "status": {"$in": OPEN_STATUSES},
+        "due_date": {"$lt": date.today().isoformat()}
+    })
+    return stats
+
+def rebuild_task_stats(db):
+    """Recompute every counter from the Task_management collection."""
+    result = next(db.Task_management.aggregate([
+        {"$facet": {
+            "total": [{"$group": {"_id": "all", "count": {"$sum": 1}}}],
+            "status": [{"$group": {"_id": "$status", "count": {"$sum": 1}}}],
+            "priority": [{"$group": {"_id": "$priority_label", "count": {"$sum": 1}}}],
+            "assignee": [{"$group": {"_id": "$assigned_to_lc", "count": {"$sum": 1}}}]
+        }}
+    ]), {})
+
+    keys = []
+    operations = []
+    for dimension, groups in result.items():
+        for group in groups:
+            key = f"{dimension}:{group['_id']}"
+            keys.append(key)
+            operations.append(ReplaceOne(
+                {"_id": key},
+                {"dimension": dimension, "value": group["_id"], "count": group["count"]},
+                upsert=True
+            ))
+
+    collection = get_task_stats_collection(db)
+    if operations:
+        collection.bulk_write(operations, ordered=False)
+    collection.delete_many({"_id": {"$nin": keys}})
@@ -0,0 +1,86 @@
+import heapq
+import threading
+import time
+from datetime import datetime, timedelta
+from flask import current_app
+
+# Short-lived tokens (OTPs, password reset tokens) keyed by namespace and key.
+# Both stores expire entries on their own and support an atomic pop() so a
+# token can only be redeemed once.
+
+class MemoryTokenStore:
+    """In-process store for single-worker deployments and development."""
+
+    def __init__(self):
+        self._data = {}  # (namespace, key) -> (value, expires_at)
+        self._expiry = []  # heap of (expires_at, namespace, key)
+        self._lock = threading.Lock()
+
+    def _sweep(self, now):
+        while self._expiry and self._expiry[0][0] <= now:
+            expires_at, namespace, key = heapq.heappop(self._expiry)
+            entry = self._data.get((namespace, key))
+            # Skip heap entries for tokens that were re-issued with a later expiry
+            if entry is not None and entry[1] == expires_at:
+                del self._data[(namespace, key)]
+
+    def put(self, namespace, key, value, ttl):
+        with self._lock:
+            now = time.monotonic()
+            self._sweep(now)
+            expires_at = now + ttl
+            self._data[(namespace, key)] = (value, expires_at)
+            heapq.heappush(self._expiry, (expires_at, namespace, key))
+
+    def get(self, namespace, key):
+        with self._lock:
+            self._sweep(time.monotonic())
+            entry = self._data.get((namespace, key))
+            return entry[0] if entry else None
+
+    def pop(self, namespace, key):
+        with self._lock:
+            self._sweep(time.monotonic())
+            entry = self._data.pop((namespace, key), None)
+            return entry[0] if entry else None
+
+class MongoTokenStore:
+    """Store shared by all workers, backed by the Auth_tokens collection.
+
+    A TTL index on expires_at removes expired tokens; reads also filter on
+    expires_at because the TTL monitor only runs about once a minute.
+    """
+
+    def get_collection(self):
+        return current_app.config['MONGO_DB'].Auth_tokens
+
+    def put(self, namespace, key, value, ttl):
+        self.get_collection().replace_one(
+            {"_id": f"{namespace}:{key}"},
+            {"value": value, "expires_at": datetime.utcnow() + timedelta(seconds=ttl)},
+            upsert=True
+        )
+
+    def get(self, namespace, key):
+        doc = self.get_collection().find_one(
+            {"_id": f"{namespace}:{key}", "expires_at": {"$gt": datetime.utcnow()}}
+        )
+        return doc["value"] if doc else None
+
+    def pop(self, namespace, key):
+        doc = self.get_collection().find_one_and_delete(
+            {"_id": f"{namespace}:{key}", "expires_at": {"$gt": datetime.utcnow()}}
+        )
+        return doc["value"] if doc else None
+
+def init_token_store(app):
+    backend = app.config.get('TOKEN_STORE', 'mongo')
+    if backend == 'memory':
+        app.extensions['token_store'] = MemoryTokenStore()
+    elif backend == 'mongo':
+        app.extensions['token_store'] = MongoTokenStore()
+    else:
+        raise ValueError(f"Unknown TOKEN_STORE backend: {backend}")
+
+def get_token_store():
+    return current_app.extensions['token_store']
@@ -0,0 +1,83 @@
+from bson import ObjectId
+from flask import current_app, g
+from utils.cache import TTLCache
+
+# Never keep password hashes in the cache
+USER_PROJECTION = {"password": 0}
+
+_MISSING = object()
+
+def init_user_cache(app):
+    app.extensions['user_cache'] = TTLCache(
+        maxsize=int(app.config.get('USER_CACHE_SIZE', 1024)),
+        ttl=float(app.config.get('USER_CACHE_TTL', 30))
+    )
+    # Kept short: it bounds how long another worker may accept a revoked token
+    app.extensions['token_version_cache'] = TTLCache(
+        maxsize=int(app.config.get('USER_CACHE_SIZE', 1024)),
+        ttl=float(app.config.get('TOKEN_VERSION_CACHE_TTL', 5))
+    )
+
+def get_user_cache():
+    return current_app.extensions['user_cache']
+
+def load_user(user_id=None):
+    """Return the user document for `user_id` (default: the authenticated user).
+
+    The result is memoized on flask.g for the rest of the request and kept in a
+    per-process TTL cache, so repeated lookups do not hit Mongo.
+    """
+    user_id = str(user_id or g.get('user_id') or '')
+    if not user_id:
+        return None
+
+    request_users = g.setdefault('loaded_users', {})
+    if user_id in request_users:
+        return request_users[user_id]
+
+    cache = get_user_cache()
+    user = cache.get(user_id)
+    if user is None:
+        try:
+            object_id = ObjectId(user_id)
+        except Exception:
+            return None
+        user = current_app.config['MONGO_DB'].User_management.find_one({"_id": object_id}, USER_PROJECTION)
+        if user is not None:
+            cache.set(user_id, user)
+
+    request_users[user_id] = user
+    return user
+
+def load_identity(user_id=None):
+    """Return the authenticated user's `_id`, `name` and `role`.
+
+    Served from the verified token claims when present, falling back to load_user().
+    """
+    user_id = str(user_id or g.get('user_id') or '')
+    claims = g.get('token_claims') or {}
+    if 'ver' in claims and claims.get('sub') == user_id and claims.get('role') and claims.get('name'):
+        return {"_id": ObjectId(user_id), "name": claims['name'], "role": claims['role']}
+    return load_user(user_id)
+
+def get_token_version(user_id):
+    """Current token_version of a user, or None if the user no longer exists."""
+    user_id = str(user_id)
+    cache = current_app.extensions['token_version_cache']
+    version = cache.get(user_id, _MISSING)
+    if version is _MISSING:
+        try:
+            object_id = ObjectId(user_id)
+        except Exception:
+            return None
+        user = current_app.config['MONGO_DB'].User_management.find_one({"_id": object_id}, {"token_version": 1})
+        version = user.get("token_version", 0) if user else None
+        cache.set(user_id, version)
+    return version
+
+def invalidate_user(user_id):
+    """Drop a user from the caches after it was modified or deleted."""
+    user_id = str(user_id)
+    get_user_cache().invalidate(user_id)
+    current_app.extensions['token_version_cache'].invalidate(user_id)
+    g.get('loaded_users', {}).pop(user_id, None)
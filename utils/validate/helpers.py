@@ -36,6 +36,31 @@ def validate_task_data(title, description, status, assigned_to, due_date, priori
     # If all validations pass
     return None, None
 
+# Task fields are all strings; check the types before the string validators run
+def validate_task_types(values):
+    for field, value in values.items():
+        if not isinstance(value, str):
+            return f'{field} must be a string', 400
+    return None, None
+
+# Validate only the task fields present in a partial update
+def validate_task_patch(values):
+    error_message, status_code = validate_task_types(values)
+    if error_message:
+        return error_message, status_code
+    checks = [
+        ("title", validate_title, 'Title cannot be empty'),
+        ("description", validate_description, 'Description cannot be empty'),
+        ("status", validate_status, 'Invalid status value. Must be one of: Not Started, In Progress, Completed.'),
+        ("assigned_to", validate_assigned_to, 'Invalid assigned user'),
+        ("due_date", validate_due_date, 'Invalid due date format. Must be in ISO format (e.g., 2024-12-31).'),
+        ("priority", validate_priority, 'Invalid priority value. Must be one of: Low, Medium, High.')
+    ]
+    for field, check, message in checks:
+        if field in values and not check(values[field]):
+            return message, 400
+    return None, None
+
 
 def validate_user_data(name, email, password):
     if not validate_name(name):
@@ -49,8 +74,8 @@ def validate_user_data(name, email, password):
 
 def email_exists(email, exclude_id=None):
     User_management = current_app.config['MONGO_DB'].User_management
-    # Use a case-insensitive regex pattern to match the email
-    query = {"email": re.compile(f"^{re.escape(email)}$", re.IGNORECASE)}
+    # Emails are stored lower-cased, so an exact match can use the unique email index
+    query = {"email": email.lower()}
     if exclude_id:
         query["_id"] = {"$ne": exclude_id}
     return User_management.find_one(query)